@@ -13,11 +13,13 @@ import { Skeleton } from "@/components/ui/skeleton"
 import { Alert, AlertDescription, AlertTitle } from "@/components/ui/alert"
 import { AlertCircle, ArrowRight, Clock, FileSpreadsheet, RefreshCw } from "lucide-react"
 import Link from "next/link"
-import { getAnalyses, type AnalysisResponse } from "@/services/api"
+import { getAnalyses, type AnalysisSummary } from "@/services/api"
 
 export default function TpaToolPage() {
-  const [analyses, setAnalyses] = useState<AnalysisResponse[]>([])
+  const [analyses, setAnalyses] = useState<AnalysisSummary[]>([])
+  const [nextCursor, setNextCursor] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState<string | null>(null)
 
   useEffect(() => {
@@ -28,8 +30,9 @@ export default function TpaToolPage() {
     try {
       setLoading(true)
       setError(null)
-      const data = await getAnalyses()
-      setAnalyses(data)
+      const page = await getAnalyses()
+      setAnalyses(page.items)
+      setNextCursor(page.next_cursor)
     } catch (err) {
       setError(err instanceof Error ? err.message : "An error occurred while fetching analyses")
     } finally {
@@ -37,6 +40,20 @@ export default function TpaToolPage() {
     }
   }
 
+  const fetchMoreAnalyses = async () => {
+    if (nextCursor === null) return
+    try {
+      setLoadingMore(true)
+      const page = await getAnalyses({ cursor: nextCursor })
+      setAnalyses((current) => [...current, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "An error occurred while fetching analyses")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const renderAnalysesList = () => {
     if (loading) {
       return Array(3)
@@ -87,7 +104,7 @@ export default function TpaToolPage() {
       )
     }
 
-    return analyses.map((analysis) => (
+    const cards = analyses.map((analysis) => (
       <Card key={analysis.id} className="mb-4">
         <CardHeader>
           <div className="flex justify-between items-start">
@@ -118,9 +135,6 @@ export default function TpaToolPage() {
             </div>
             <div>
               <span>Files: {analysis.file_ids.length}</span>
-              {analysis.parameters && (
-                <span className="ml-4">Paths: {analysis.parameters.selected_paths?.length || 0}</span>
-              )}
             </div>
           </div>
         </CardContent>
@@ -138,6 +152,19 @@ export default function TpaToolPage() {
         </CardFooter>
       </Card>
     ))
+
+    return (
+      <>
+        {cards}
+        {nextCursor !== null && (
+          <div className="flex justify-center">
+            <Button variant="outline" onClick={fetchMoreAnalyses} disabled={loadingMore}>
+              {loadingMore ? "Loading..." : "Load more"}
+            </Button>
+          </div>
+        )}
+      </>
+    )
   }
 
   return (
@@ -0,0 +1,64 @@
+from typing import Dict, Optional
+from fastapi import Request, Response
+from ..core.config import settings
+from ..core.metrics import count_cache
+
+# HTTP caching for analysis resources.
+#
+# Responses about an analysis carry a weak ETag derived from its id and
+# ``version``, which every write to the row increments (``updated_at`` has
+# one-second resolution in SQLite and is unset until the first update). The tag
+# is weak because it identifies the state of the analysis, not the bytes sent:
+# the gzip and identity encodings of a response share it. Clients revalidate with
+# If-None-Match and get an empty 304 while the analysis is unchanged; completed
+# analyses can additionally be reused from the client cache without asking.
+
+class NotModified(Exception):
+    """Raised by an endpoint to answer 304 Not Modified with the given headers."""
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers=exc.headers)
+
+def analysis_etag(analysis_id: int, version: Optional[int]) -> str:
+    return f'W/"analysis-{analysis_id}-{version or 0}"'
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [_opaque_tag(tag) for tag in if_none_match.split(",")]
+    # Weak comparison, as RFC 7232 requires for If-None-Match
+    return "*" in tags or _opaque_tag(etag) in tags
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    analysis_id: int,
+    version: Optional[int],
+    status: str
+):
+    """
+    Set the caching headers of an analysis response, or raise ``NotModified``.
+
+    Completed analyses do not change, so they may be cached for
+    ANALYSIS_CACHE_MAX_AGE seconds; anything still in progress must be
+    revalidated on every request.
+    """
+    headers = {
+        "ETag": analysis_etag(analysis_id, version),
+        "Cache-Control": (
+            f"private, max-age={settings.ANALYSIS_CACHE_MAX_AGE}"
+            if status == "completed" else "no-cache"
+        ),
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        matched = _matches(if_none_match, headers["ETag"])
+        count_cache("http_etag", matched)
+        if matched:
+            raise NotModified(headers)
+    response.headers.update(headers)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+from ..db.base import SessionLocal
+from ..db.models.analysis import Analysis as AnalysisModel, AnalysisStatus
+from ..core.config import settings
+
+# Server-Sent Events stream of analysis progress.
+#
+# However many clients watch, the API reads the progress of all watched
+# analyses with one query per PROGRESS_POLL_INTERVAL and fans changes out to
+# the watchers' queues. A watcher only ever holds the latest state, so a slow
+# client skips intermediate updates instead of buffering them. The stream ends
+# with a ``done`` event once the analysis is completed, failed or cancelled.
+
+logger = logging.getLogger(__name__)
+
+FINAL_STATUSES = (AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value, AnalysisStatus.CANCELLED.value)
+
+def _event(name: str, data: Dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+class ProgressHub:
+    """Polls the progress of watched analyses and publishes it to their watchers."""
+
+    def __init__(self, interval: float = settings.PROGRESS_POLL_INTERVAL):
+        self.interval = interval
+        self._watchers: Dict[int, Set[asyncio.Queue]] = {}
+        self._snapshots: Dict[int, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def watchers(self) -> int:
+        return sum(len(queues) for queues in self._watchers.values())
+
+    async def stream(self, analysis_id: int) -> AsyncIterator[str]:
+        """Event stream of one analysis, until it reaches a final status."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribe(analysis_id, queue)
+        try:
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), settings.PROGRESS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if snapshot["status"] in FINAL_STATUSES or snapshot["status"] is None:
+                    yield _event("done", snapshot)
+                    return
+                yield _event("progress", snapshot)
+        finally:
+            self._unsubscribe(analysis_id, queue)
+
+    def _subscribe(self, analysis_id: int, queue: asyncio.Queue):
+        self._watchers.setdefault(analysis_id, set()).add(queue)
+        if analysis_id in self._snapshots:
+            queue.put_nowait(self._snapshots[analysis_id])
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_event_loop().create_task(self._poll_loop())
+        self._wakeup.set()
+
+    def _unsubscribe(self, analysis_id: int, queue: asyncio.Queue):
+        queues = self._watchers.get(analysis_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._watchers[analysis_id]
+            self._snapshots.pop(analysis_id, None)
+
+    async def _poll_loop(self):
+        # Runs while anyone is watching; the next subscriber restarts it
+        while self._watchers:
+            try:
+                snapshots = await run_in_threadpool(self._fetch, list(self._watchers))
+                self._publish(snapshots)
+            except Exception as e:
+                logger.error(f"Error polling analysis progress: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _fetch(self, analysis_ids: List[int]) -> Dict[int, Dict]:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(AnalysisModel.id, AnalysisModel.status, AnalysisModel.progress, AnalysisModel.error_message)
+                .filter(AnalysisModel.id.in_(analysis_ids))
+                .all()
+            )
+        finally:
+            db.close()
+        snapshots = {
+            analysis_id: {"id": analysis_id, "status": None, "progress": None, "error_message": "Analysis not found"}
+            for analysis_id in analysis_ids
+        }
+        for analysis_id, status, progress, error_message in rows:
+            snapshots[analysis_id] = {
+                "id": analysis_id, "status": status, "progress": progress, "error_message": error_message
+            }
+        return snapshots
+
+    def _publish(self, snapshots: Dict[int, Dict]):
+        for analysis_id, snapshot in snapshots.items():
+            queues = self._watchers.get(analysis_id)
+            if not queues or self._snapshots.get(analysis_id) == snapshot:
+                continue
+            self._snapshots[analysis_id] = snapshot
+            for queue in queues:
+                if queue.full():
+                    queue.get_nowait()  # Drop the state the client has not read yet
+                queue.put_nowait(snapshot)
+
+progress_hub = ProgressHub()
+
+class EventStreamGZipMiddleware(GZipMiddleware):
+    """
+    GZip middleware that leaves event streams uncompressed.
+
+    Compressed streaming bodies are held back by the compressor until enough
+    output accumulates, which would delay progress events indefinitely.
+    Event stream requests are recognised by their ``Accept`` header, which
+    EventSource always sends.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            accept = dict(scope["headers"]).get(b"accept", b"")
+            if b"text/event-stream" in accept:
+                await self.app(scope, receive, send)
+                return
+        await super().__call__(scope, receive, send)
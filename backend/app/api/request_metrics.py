@@ -0,0 +1,43 @@
+import time
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..core.metrics import REQUEST_LATENCY
+
+class RequestMetricsMiddleware:
+    """
+    Records the latency of every HTTP request by method, route and status.
+
+    Requests are labelled with the route template (``/api/analysis/{analysis_id}``),
+    not the raw path, so the number of label values stays bounded. Streaming
+    responses are timed until their last byte.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUEST_LATENCY.labels(
+                method=scope["method"], route=_route_template(scope), status=str(status["code"])
+            ).observe(time.perf_counter() - start)
+
+def _route_template(scope: Scope) -> str:
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
@@ -1,28 +1,52 @@
-import asyncio
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
-from sqlalchemy.orm import Session
-from typing import List
-from ...db.base import get_db
-from ...schemas.analysis import AnalysisCreate, AnalysisResponse, AnalysisStatus
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, load_only
+from typing import Optional
+from ...db.base import SessionLocal, get_db
+from ...schemas.analysis import AnalysisCreate, AnalysisPage, AnalysisResponse, AnalysisStatus
 from ...db.models.analysis import Analysis as AnalysisModel, AnalysisStatus as DBAnalysisStatus
-from ...processing.tpa_engine import run_analysis
+from ...db.models.file import File as FileModel, FileStatus
+from ...processing.job_executor import executor, pending_count
+from ...processing.result_cache import result_cache
+from ..http_cache import check_not_modified
+from ..progress_stream import progress_hub
+from ...core.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Store background tasks with their status
-background_tasks_status = {}
+# Columns of an analysis list entry; parameters and results are never loaded
+SUMMARY_COLUMNS = ("id", "name", "description", "file_ids", "status", "error_message", "progress", "created_at", "updated_at")
 
 @router.post("/", response_model=AnalysisResponse)
-async def create_analysis(
+def create_analysis(
     analysis: AnalysisCreate,
-    background_tasks: BackgroundTasks,
-    request: Request,
     db: Session = Depends(get_db)
 ):
-    # Create analysis record
+    # Reject new work when the queue is full instead of growing it without bound
+    if pending_count(db) >= settings.ANALYSIS_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis queue is full. Please try again later."
+        )
+    
+    # Files must have finished processing before they can be analysed
+    files = db.query(FileModel).filter(FileModel.id.in_(analysis.file_ids)).all()
+    if any(f.status == FileStatus.PROCESSING for f in files):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Some files are still being processed. Please try again shortly."
+        )
+    failed = [f.filename for f in files if f.status == FileStatus.FAILED]
+    if failed:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Files could not be processed: {', '.join(failed)}"
+        )
+    
+    # Create analysis record; the executor picks it up from the PENDING state
     db_analysis = AnalysisModel(
         name=analysis.name,
         description=analysis.description,
@@ -34,52 +58,117 @@ async def create_analysis(
     db.commit()
     db.refresh(db_analysis)
     
-    # Set up a task to check for timeout
-    async def check_timeout(analysis_id: int, timeout_seconds: int = 300):
-        await asyncio.sleep(timeout_seconds)
-        # Check if analysis is still running
-        db_session = next(get_db())
-        analysis = db_session.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-        if analysis and analysis.status == DBAnalysisStatus.RUNNING:
-            logger.warning(f"Analysis {analysis_id} timed out after {timeout_seconds} seconds")
-            analysis.status = DBAnalysisStatus.FAILED
-            analysis.error_message = f"Analysis timed out after {timeout_seconds} seconds"
-            db_session.commit()
-    
-    # Run analysis in background
-    background_tasks.add_task(
-        run_analysis,
-        analysis_id=db_analysis.id,
-        file_ids=analysis.file_ids,
-        parameters=analysis.parameters,
-        db=db
-    )
-    
-    # Add timeout check
-    background_tasks.add_task(
-        check_timeout,
-        analysis_id=db_analysis.id
-    )
+    executor.notify()
     
     return db_analysis
 
-@router.get("/", response_model=List[AnalysisResponse])
+@router.get("/", response_model=AnalysisPage)
 def get_analyses(
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=settings.ANALYSIS_PAGE_MAX_SIZE),
+    status_filter: Optional[AnalysisStatus] = Query(None, alias="status"),
+    name: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    analyses = db.query(AnalysisModel).offset(skip).limit(limit).all()
-    return analyses
+    """
+    List analyses newest first, without their parameters and results.
 
-@router.get("/{analysis_id}", response_model=AnalysisResponse)
-def get_analysis(
+    Ids increase in creation order, so pages are delimited by the last id seen
+    rather than an offset: each page is one index range scan however deep the
+    client pages. ``name`` matches a name prefix.
+    """
+    query = db.query(AnalysisModel).options(load_only(*SUMMARY_COLUMNS))
+    if status_filter is not None:
+        query = query.filter(AnalysisModel.status == status_filter.value)
+    if name:
+        # A range instead of LIKE, so the name index is usable
+        query = query.filter(AnalysisModel.name >= name, AnalysisModel.name < name + "\uffff")
+    if cursor is not None:
+        query = query.filter(AnalysisModel.id < cursor)
+    analyses = query.order_by(AnalysisModel.id.desc()).limit(limit + 1).all()
+    next_cursor = analyses[limit - 1].id if len(analyses) > limit else None
+    return AnalysisPage(items=analyses[:limit], next_cursor=next_cursor)
+
+@router.get("/{analysis_id}/events")
+def stream_analysis_progress(analysis_id: int):
+    """
+    Stream the progress of an analysis as Server-Sent Events.
+
+    ``progress`` events carry the status, stage, percent done and ETA; the
+    stream ends with a ``done`` event once the analysis completed or failed.
+    """
+    # Not a get_db dependency: that session would stay open for the whole stream
+    db = SessionLocal()
+    try:
+        exists = db.query(AnalysisModel.id).filter(AnalysisModel.id == analysis_id).first()
+    finally:
+        db.close()
+    if exists is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    return StreamingResponse(
+        progress_hub.stream(analysis_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/{analysis_id}/cancel", response_model=AnalysisResponse, status_code=status.HTTP_202_ACCEPTED)
+def cancel_analysis(
     analysis_id: int,
     db: Session = Depends(get_db)
 ):
+    """
+    Cancel a queued or running analysis.
+
+    A queued analysis is cancelled right away. A running one is flagged and
+    stops at the engine's next progress update, releasing its worker.
+    """
     analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
     if analysis is None:
         raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    # Conditional updates: the executor may claim or finish the job concurrently
+    cancelled = (
+        db.query(AnalysisModel)
+        .filter(AnalysisModel.id == analysis_id, AnalysisModel.status == DBAnalysisStatus.PENDING)
+        .update(
+            {AnalysisModel.status: DBAnalysisStatus.CANCELLED, AnalysisModel.error_message: "Analysis cancelled"},
+            synchronize_session=False
+        )
+    )
+    if not cancelled:
+        cancelled = (
+            db.query(AnalysisModel)
+            .filter(AnalysisModel.id == analysis_id, AnalysisModel.status == DBAnalysisStatus.RUNNING)
+            .update({AnalysisModel.cancel_requested: True}, synchronize_session=False)
+        )
+    db.commit()
+    if not cancelled:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Analysis is already {analysis.status}"
+        )
+    
+    db.refresh(analysis)
+    return analysis
+
+@router.get("/{analysis_id}", response_model=AnalysisResponse)
+def get_analysis(
+    analysis_id: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    version = (
+        db.query(AnalysisModel.version, AnalysisModel.status)
+        .filter(AnalysisModel.id == analysis_id)
+        .first()
+    )
+    if version is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    check_not_modified(request, response, analysis_id, version.version, version.status)
+    
+    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
     return analysis
 
 @router.delete("/{analysis_id}")
@@ -91,8 +180,13 @@ def delete_analysis(
     if analysis is None:
         raise HTTPException(status_code=404, detail="Analysis not found")
     
+    results_path = analysis.results_path
     db.delete(analysis)
     db.commit()
+    # Imported on first delete: result_store pulls in numpy
+    from ...processing.result_store import delete_results
+    delete_results(results_path)
+    result_cache.invalidate(analysis_id)
     
     return {"message": "Analysis deleted successfully"}
 
@@ -1,20 +1,96 @@
 import os
-import shutil
-from typing import List
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status, BackgroundTasks
+import uuid
+import hashlib
+import tempfile
+import aiofiles
+from typing import List, Tuple
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
 from sqlalchemy.orm import Session
 from ...db.base import get_db
 from ...schemas.file import FileCreate, FileResponse
-from ...db.models.file import File as FileModel
+from ...db.models.file import File as FileModel, FileStatus
 from ...core.config import settings
-from ...processing.file_processor import process_file, validate_file_type
+from ...processing.file_processor import validate_file_type
+from ...processing.metadata_extractor import extractor
 
 router = APIRouter()
 
-@router.post("/upload/", response_model=FileResponse)
+async def _stream_to_temp_file(file: UploadFile) -> Tuple[str, int, str]:
+    """
+    Copy an upload to a temporary file in fixed-size chunks.
+
+    The size limit is enforced and the SHA-256 digest computed while streaming,
+    so at most one chunk is held in memory and oversized uploads are aborted as
+    soon as they cross the limit. Returns the temporary path, size and digest.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=settings.UPLOAD_FOLDER, prefix=".upload-")
+    os.close(fd)
+
+    file_size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE / (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return temp_path, file_size, digest.hexdigest()
+
+def _content_path(content_hash: str, file_ext: str) -> str:
+    """Storage path of a blob, fanned out by the first two hex digits of its hash."""
+    return os.path.join(settings.UPLOAD_FOLDER, content_hash[:2], f"{content_hash}{file_ext}")
+
+def _is_referenced(db: Session, file_path: str) -> bool:
+    """Whether any file record points at the stored blob."""
+    return db.query(FileModel.id).filter(FileModel.filepath == file_path).first() is not None
+
+def _store_blob(temp_path: str, file_path: str):
+    """Move an upload into place, unless the same content is already stored."""
+    if os.path.exists(file_path):
+        os.remove(temp_path)
+    else:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.replace(temp_path, file_path)
+
+def _release_blob(db: Session, file_path: str):
+    """
+    Remove a stored blob once no file record points at it.
+
+    Uploads commit their record before storing the blob, so the blob is first
+    moved aside and the references checked again: an upload that committed in
+    the meantime gets it back, and one that commits later finds it missing and
+    stores its own copy.
+    """
+    if _is_referenced(db, file_path):
+        return
+    removed = f"{file_path}.deleted-{uuid.uuid4().hex}"
+    try:
+        os.replace(file_path, removed)
+    except OSError:
+        return  # Not stored, or removed by a concurrent delete
+    if _is_referenced(db, file_path):
+        os.replace(removed, file_path)
+        return
+    os.remove(removed)
+    # Imported on first delete: the cache module pulls in pyarrow and pandas
+    from ...processing import column_cache
+    column_cache.delete_cache(file_path)
+
+@router.post("/upload/", response_model=FileResponse, response_model_by_alias=False)
 async def upload_file(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None,
     db: Session = Depends(get_db)
 ):
     # Validate file type
@@ -24,59 +100,68 @@ async def upload_file(
             detail="Invalid file type. Supported types: .csv, .xlsx, .mat, .h5"
         )
     
-    # Check file size
-    file_size = 0
-    file_content = await file.read()
-    file_size = len(file_content)
-    await file.seek(0)  # Reset file pointer
-    
-    if file_size > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Maximum size: {settings.MAX_UPLOAD_SIZE / (1024 * 1024)} MB"
-        )
-    
     # Create upload directory if it doesn't exist
     os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
     
+    # Stream to disk, checking size and hashing on the way
+    temp_path, file_size, content_hash = await _stream_to_temp_file(file)
+    
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    
+    committed_id = None
     try:
-        # Save file
-        file_path = os.path.join(settings.UPLOAD_FOLDER, file.filename)
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        # Content-addressed storage: identical uploads share one stored blob
+        file_path = _content_path(content_hash, file_ext)
         
-        # Process file to extract metadata
-        try:
-            metadata = process_file(file_path)
-        except Exception as e:
-            # Clean up file if processing fails
-            os.remove(file_path)
-            raise HTTPException(
-                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                detail=f"Error processing file: {str(e)}"
-            )
+        # Reuse metadata already extracted for the same content: only a READY row
+        # with the same content hash and blob path holds complete metadata, rows
+        # still being processed or that failed are ignored.
+        cached = db.query(FileModel).filter(
+            FileModel.content_hash == content_hash,
+            FileModel.filepath == file_path,
+            FileModel.status == FileStatus.READY
+        ).first()
         
-        # Save file info to database
+        # Save file info to database; metadata is extracted off the request path
         db_file = FileModel(
             filename=file.filename,
             filepath=file_path,
             filetype=os.path.splitext(file.filename)[1],
             filesize=file_size,
-            metadata=metadata
+            content_hash=content_hash,
+            file_metadata=cached.file_metadata if cached is not None else None,
+            status=FileStatus.READY if cached is not None else FileStatus.PROCESSING
         )
         db.add(db_file)
         db.commit()
         db.refresh(db_file)
+        committed_id = db_file.id
+        
+        # Stored only once the record is committed, so that a concurrent delete of
+        # the same content either sees the record or has already moved the blob away
+        _store_blob(temp_path, file_path)
+        
+        if db_file.status == FileStatus.PROCESSING:
+            extractor.submit(db_file.id)
         
         return db_file
+    except HTTPException:
+        raise
     except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if committed_id is not None and not os.path.exists(file_path):
+            # The record was committed but its blob could not be stored
+            db.rollback()
+            db.query(FileModel).filter(FileModel.id == committed_id).delete(synchronize_session=False)
+            db.commit()
         # Handle any other exceptions
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error uploading file: {str(e)}"
         )
 
-@router.get("/", response_model=List[FileResponse])
+@router.get("/", response_model=List[FileResponse], response_model_by_alias=False)
 def get_files(
     skip: int = 0,
     limit: int = 100,
@@ -85,7 +170,7 @@ def get_files(
     files = db.query(FileModel).offset(skip).limit(limit).all()
     return files
 
-@router.get("/{file_id}", response_model=FileResponse)
+@router.get("/{file_id}", response_model=FileResponse, response_model_by_alias=False)
 def get_file(
     file_id: int,
     db: Session = Depends(get_db)
@@ -104,15 +189,11 @@ def delete_file(
     if file is None:
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Delete physical file
-    try:
-        os.remove(file.filepath)
-    except OSError:
-        pass  # File might not exist
-    
-    # Delete from database
+    # Delete from database, then the physical file unless another record shares the same content
+    file_path = file.filepath
     db.delete(file)
     db.commit()
+    _release_blob(db, file_path)
     
     return {"message": "File deleted successfully"}
 
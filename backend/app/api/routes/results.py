@@ -1,124 +1,237 @@
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from ...db.base import get_db
 from ...db.models.analysis import Analysis as AnalysisModel
+from ...processing.result_cache import CachedResult, result_cache
+from ..http_cache import check_not_modified
 
 router = APIRouter()
 
+# result_store is imported where stored series are read rather than at module
+# level, so numpy is loaded on the first results request instead of at startup.
+
+def _get_analysis_with_results(analysis_id: int, db: Session, request: Request, response: Response) -> CachedResult:
+    """
+    Decoded results of an analysis, from the results cache when it is current.
+
+    Only the key columns are read to validate a cached entry or to answer a
+    conditional request with 304; the results JSON is loaded and decoded on a
+    miss.
+    """
+    row = (
+        db.query(
+            AnalysisModel.id, AnalysisModel.name, AnalysisModel.status,
+            AnalysisModel.created_at, AnalysisModel.updated_at, AnalysisModel.version, AnalysisModel.results_path
+        )
+        .filter(AnalysisModel.id == analysis_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    check_not_modified(request, response, row.id, row.version, row.status)
+
+    cached = result_cache.get(analysis_id, row.version)
+    if cached is not None:
+        return cached
+
+    results = db.query(AnalysisModel.results).filter(AnalysisModel.id == analysis_id).scalar()
+    if not results:
+        raise HTTPException(status_code=404, detail="Results not available")
+
+    cached = CachedResult(
+        analysis_id=row.id,
+        name=row.name,
+        status=row.status,
+        created_at=row.created_at,
+        updated_at=row.updated_at,
+        version=row.version,
+        results=results,
+        arrays=_load_arrays(row.results_path)
+    )
+    result_cache.put(cached)
+    return cached
+
+def _load_arrays(results_path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Memory-map the stored series, or None for results stored inline as JSON."""
+    if not results_path:
+        return None
+    from ...processing import result_store
+    try:
+        return result_store.open_arrays(results_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Result data not found")
+
+def _in_range(records: List[Dict[str, Any]], f_min: Optional[float], f_max: Optional[float]) -> List[Dict[str, Any]]:
+    """Frequency range filter for results stored inline as JSON."""
+    return [
+        r for r in records
+        if (f_min is None or r["frequency"] >= f_min) and (f_max is None or r["frequency"] <= f_max)
+    ]
+
 @router.get("/{analysis_id}/summary")
 def get_analysis_summary(
     analysis_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-    if analysis is None:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    if not analysis.results:
-        raise HTTPException(status_code=404, detail="Results not available")
-    
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
     # Extract summary from results
     summary = {
-        "analysis_id": analysis.id,
+        "analysis_id": analysis.analysis_id,
         "name": analysis.name,
         "status": analysis.status,
         "created_at": analysis.created_at,
         "completed_at": analysis.updated_at,
         "metrics": analysis.results.get("metrics", {}),
     }
-    
+
     return summary
 
 @router.get("/{analysis_id}/contributions")
 def get_path_contributions(
     analysis_id: int,
+    request: Request,
+    response: Response,
     frequency: Optional[float] = Query(None, description="Filter by specific frequency"),
+    f_min: Optional[float] = Query(None, description="Lower bound of the frequency range"),
+    f_max: Optional[float] = Query(None, description="Upper bound of the frequency range"),
+    max_points: Optional[int] = Query(None, ge=2, description="Decimate to at most this many points, keeping peaks"),
+    path_ids: Optional[List[int]] = Query(None, description="Restrict to these paths"),
     db: Session = Depends(get_db)
 ):
-    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-    if analysis is None:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    if not analysis.results:
-        raise HTTPException(status_code=404, detail="Results not available")
-    
-    contributions = analysis.results.get("contributions", [])
-    
-    # Filter by frequency if provided
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
+    arrays = analysis.arrays
+    if arrays is None:
+        contributions = _in_range(analysis.results.get("contributions", []), f_min, f_max)
+        # Filter by frequency if provided
+        if frequency is not None:
+            contributions = [c for c in contributions if abs(c["frequency"] - frequency) < 0.1]
+        return contributions
+
+    from ...processing import result_store
+    columns = result_store.path_columns(arrays, path_ids)
     if frequency is not None:
-        contributions = [c for c in contributions if abs(c["frequency"] - frequency) < 0.1]
-    
-    return contributions
+        row = result_store.nearest_row(arrays["frequency"], frequency, tolerance=0.1)
+        if row is None:
+            return []
+        return result_store.contribution_records(arrays, columns, slice(row, row + 1))
+
+    rows = result_store.frequency_rows(arrays["frequency"], f_min, f_max)
+    if max_points:
+        rows = result_store.decimate_rows(arrays["contribution"], rows, max_points, columns)
+    return result_store.contribution_records(arrays, columns, rows)
 
 @router.get("/{analysis_id}/transfer-functions")
 def get_transfer_functions(
     analysis_id: int,
+    request: Request,
+    response: Response,
     path_id: Optional[int] = Query(None, description="Filter by specific path"),
+    path_ids: Optional[List[int]] = Query(None, description="Restrict to these paths"),
+    f_min: Optional[float] = Query(None, description="Lower bound of the frequency range"),
+    f_max: Optional[float] = Query(None, description="Upper bound of the frequency range"),
+    max_points: Optional[int] = Query(None, ge=2, description="Decimate each path to at most this many points"),
     db: Session = Depends(get_db)
 ):
-    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-    if analysis is None:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    if not analysis.results:
-        raise HTTPException(status_code=404, detail="Results not available")
-    
-    transfer_functions = analysis.results.get("transfer_functions", [])
-    
-    # Filter by path if provided
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
     if path_id is not None:
-        transfer_functions = [tf for tf in transfer_functions if tf["path_id"] == path_id]
-    
+        path_ids = (path_ids or []) + [path_id]
+
+    arrays = analysis.arrays
+    if arrays is not None:
+        from ...processing import result_store
+        columns = result_store.path_columns(arrays, path_ids)
+        rows = result_store.frequency_rows(arrays["frequency"], f_min, f_max)
+        return result_store.transfer_function_records(arrays, columns, rows, max_points)
+
+    transfer_functions = _in_range(analysis.results.get("transfer_functions", []), f_min, f_max)
+
+    # Filter by path if provided
+    if path_ids is not None:
+        transfer_functions = [tf for tf in transfer_functions if tf["path_id"] in path_ids]
+
     return transfer_functions
 
 @router.get("/{analysis_id}/system-response")
 def get_system_response(
     analysis_id: int,
+    request: Request,
+    response: Response,
+    f_min: Optional[float] = Query(None, description="Lower bound of the frequency range"),
+    f_max: Optional[float] = Query(None, description="Upper bound of the frequency range"),
+    max_points: Optional[int] = Query(None, ge=2, description="Decimate to at most this many points, keeping peaks"),
     db: Session = Depends(get_db)
 ):
-    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-    if analysis is None:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    if not analysis.results:
-        raise HTTPException(status_code=404, detail="Results not available")
-    
-    system_response = analysis.results.get("system_response", [])
-    
-    return system_response
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
+    arrays = analysis.arrays
+    if arrays is None:
+        return _in_range(analysis.results.get("system_response", []), f_min, f_max)
+
+    from ...processing import result_store
+    rows = result_store.frequency_rows(arrays["frequency"], f_min, f_max)
+    if max_points:
+        rows = result_store.decimate_rows(arrays["response"], rows, max_points)
+    return result_store.system_response_records(arrays, rows)
 
 @router.get("/{analysis_id}/rms-comparison")
 def get_rms_comparison(
     analysis_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Get RMS comparison between measured and predicted targets"""
-    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-    if analysis is None:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    if not analysis.results:
-        raise HTTPException(status_code=404, detail="Results not available")
-    
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
     rms_comparison = analysis.results.get("rms_comparison", [])
-    
+
     return rms_comparison
 
 @router.get("/{analysis_id}/performance-indicators")
 def get_performance_indicators(
     analysis_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """Get performance indicators for the analysis"""
-    analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
-    if analysis is None:
-        raise HTTPException(status_code=404, detail="Analysis not found")
-    
-    if not analysis.results:
-        raise HTTPException(status_code=404, detail="Results not available")
-    
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
     indicators = analysis.results.get("performance_indicators", {})
-    
+
     return indicators
 
+@router.get("/{analysis_id}/matrix-conditioning")
+def get_matrix_conditioning(
+    analysis_id: int,
+    request: Request,
+    response: Response,
+    f_min: Optional[float] = Query(None, description="Lower bound of the frequency range"),
+    f_max: Optional[float] = Query(None, description="Upper bound of the frequency range"),
+    max_points: Optional[int] = Query(None, ge=2, description="Decimate to at most this many points, keeping peaks"),
+    db: Session = Depends(get_db)
+):
+    """Get per-frequency condition numbers, singular values and the regularization sweep"""
+    analysis = _get_analysis_with_results(analysis_id, db, request, response)
+
+    arrays = analysis.arrays
+    if arrays is None:
+        matrix_conditioning = _in_range(analysis.results.get("matrix_conditioning", []), f_min, f_max)
+    else:
+        from ...processing import result_store
+        rows = result_store.frequency_rows(arrays["frequency"], f_min, f_max)
+        if max_points:
+            rows = result_store.decimate_rows(arrays["condition_number"], rows, max_points)
+        matrix_conditioning = result_store.conditioning_records(arrays, rows)
+
+    return {
+        "matrix_conditioning": matrix_conditioning,
+        "regularization_sweep": analysis.results.get("regularization_sweep", [])
+    }
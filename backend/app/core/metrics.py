@@ -0,0 +1,96 @@
+from typing import Any, Dict, Tuple
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Prometheus metrics of the API and the analysis executor.
+#
+# Metrics live in the registry of the API (or standalone executor) process.
+# Job and metadata worker processes do not record metrics themselves: they
+# return a small stats dict that the parent records with ``record_job_stats``,
+# so no per-process metric files pile up however many jobs run.
+
+registry = CollectorRegistry()
+
+REQUEST_LATENCY = Histogram(
+    "tpa_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    registry=registry
+)
+
+STAGE_DURATION = Histogram(
+    "tpa_analysis_stage_duration_seconds",
+    "Duration of the stages of run_analysis",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+    registry=registry
+)
+
+ANALYSES = Counter(
+    "tpa_analyses_total",
+    "Finished analyses by final status",
+    ["status"],
+    registry=registry
+)
+
+BYTES_READ = Counter(
+    "tpa_file_bytes_read_total",
+    "Bytes of data files read, by file type and operation",
+    ["file_type", "operation"],
+    registry=registry
+)
+
+CACHE_REQUESTS = Counter(
+    "tpa_cache_requests_total",
+    "Cache lookups by cache and result (hit or miss)",
+    ["cache", "result"],
+    registry=registry
+)
+
+def count_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+def new_job_stats() -> Dict[str, Any]:
+    """Stats a worker process collects for its parent to record."""
+    return {"status": None, "stages": {}, "bytes_read": {}, "cache": {}}
+
+def record_job_stats(stats: Dict[str, Any], operation: str = "analysis"):
+    if stats.get("status"):
+        ANALYSES.labels(status=stats["status"]).inc()
+    for stage, seconds in stats.get("stages", {}).items():
+        STAGE_DURATION.labels(stage=stage).observe(seconds)
+    for file_type, n_bytes in stats.get("bytes_read", {}).items():
+        BYTES_READ.labels(file_type=file_type, operation=operation).inc(n_bytes)
+    for cache, counts in stats.get("cache", {}).items():
+        for result, count in counts.items():
+            CACHE_REQUESTS.labels(cache=cache, result=result).inc(count)
+
+class QueueDepthCollector:
+    """Analyses per queue status, counted in the database at scrape time."""
+
+    def collect(self):
+        # Imported here: the database layer is not needed to define metrics
+        from sqlalchemy import func
+        from ..db.base import SessionLocal
+        from ..db.models.analysis import Analysis as AnalysisModel, AnalysisStatus
+
+        db = SessionLocal()
+        try:
+            counts = dict(
+                db.query(AnalysisModel.status, func.count(AnalysisModel.id))
+                .filter(AnalysisModel.status.in_([AnalysisStatus.PENDING, AnalysisStatus.RUNNING]))
+                .group_by(AnalysisModel.status)
+                .all()
+            )
+        finally:
+            db.close()
+        gauge = GaugeMetricFamily("tpa_analysis_queue_depth", "Analyses waiting or running", labels=["status"])
+        for status in (AnalysisStatus.PENDING, AnalysisStatus.RUNNING):
+            gauge.add_metric([status.value], counts.get(status.value, 0))
+        yield gauge
+
+registry.register(QueueDepthCollector())
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, and its content type."""
+    return generate_latest(registry), CONTENT_TYPE_LATEST
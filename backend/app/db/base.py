@@ -1,26 +1,65 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy import JSON, create_engine, event, inspect, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from ..core.config import settings
 import os
 import logging
 
+# Database engine for SQLite (the default) or PostgreSQL.
+#
+# SQLite runs in WAL mode so readers (the results routes, progress streams)
+# never block on the writers (analysis jobs, the metadata extractor) and vice
+# versa; writers from different processes wait up to DB_BUSY_TIMEOUT for each
+# other instead of failing with "database is locked". PostgreSQL gets a pool
+# of DB_POOL_SIZE connections per process, checked before use so connections
+# dropped by a database restart are replaced transparently.
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Ensure the database directory exists
-db_path = os.path.dirname(settings.SQLALCHEMY_DATABASE_URI.replace("sqlite:///", ""))
-if db_path and not os.path.exists(db_path):
-    os.makedirs(db_path, exist_ok=True)
-    logger.info(f"Created database directory: {db_path}")
+# JSON columns: binary JSONB on PostgreSQL, JSON text elsewhere
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+def _engine_options(url) -> Dict[str, Any]:
+    if url.get_backend_name() == "sqlite":
+        # The sqlite3 timeout is the busy timeout, in seconds
+        return {"connect_args": {"check_same_thread": False, "timeout": settings.DB_BUSY_TIMEOUT}}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL is a property of the database file, so an in-memory database keeps its journal
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints rather than at every commit: safe in WAL mode and much cheaper
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    finally:
+        cursor.close()
+
+database_url = make_url(settings.SQLALCHEMY_DATABASE_URI)
+
+# Ensure the directory of a SQLite database file exists
+if database_url.get_backend_name() == "sqlite" and database_url.database not in (None, "", ":memory:"):
+    db_path = os.path.dirname(database_url.database)
+    if db_path and not os.path.exists(db_path):
+        os.makedirs(db_path, exist_ok=True)
+        logger.info(f"Created database directory: {db_path}")
 
 try:
-    engine = create_engine(
-        settings.SQLALCHEMY_DATABASE_URI, 
-        connect_args={"check_same_thread": False} if settings.SQLALCHEMY_DATABASE_URI.startswith("sqlite") else {}
-    )
-    logger.info(f"Connected to database: {settings.SQLALCHEMY_DATABASE_URI}")
+    engine = create_engine(database_url, **_engine_options(database_url))
+    if database_url.get_backend_name() == "sqlite":
+        event.listen(engine, "connect", _configure_sqlite)
+    logger.info(f"Connected to database: {database_url!r}")
 except Exception as e:
     logger.error(f"Failed to connect to database: {str(e)}")
     raise
@@ -29,6 +68,26 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def add_missing_columns():
+    """Add model columns (and their indexes) missing from existing tables.
+
+    ``create_all`` only creates tables that do not exist yet, so columns added to a
+    model later are added here. Only nullable columns without defaults are supported.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in existing]
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
 # Dependency
 def get_db():
     db = SessionLocal()
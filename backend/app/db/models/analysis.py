@@ -1,25 +1,37 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Index, Boolean, literal_column
 from sqlalchemy.sql import func
 import enum
-from ..base import Base
+from ..base import Base, JSONDocument
 
 class AnalysisStatus(str, enum.Enum):
     PENDING = "pending"
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # Keyset pagination of the analysis list filtered by status, newest first
+        Index("ix_analyses_status_id", "status", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     description = Column(String, nullable=True)
-    parameters = Column(JSON)
-    file_ids = Column(JSON)  # Store as JSON array
+    parameters = Column(JSONDocument)
+    file_ids = Column(JSONDocument)  # Store as JSON array
     status = Column(String, default=AnalysisStatus.PENDING)
-    results = Column(JSON, nullable=True)
+    results = Column(JSONDocument, nullable=True)  # Summary only; per-frequency series live in results_path
+    results_path = Column(String, nullable=True)
     error_message = Column(String, nullable=True)
+    progress = Column(JSONDocument, nullable=True)  # Stage, percent and ETA while running
+    cancel_requested = Column(Boolean, nullable=True)  # Set by the cancel endpoint, polled by the engine
+    worker_id = Column(String, nullable=True)  # Executor that claimed the running analysis
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)  # Last time that executor renewed its claim
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Incremented by every UPDATE, bulk ones included; identifies the row state in ETags
+    version = Column(Integer, default=0, onupdate=literal_column("coalesce(version, 0) + 1"), nullable=True)
 
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Float
+from sqlalchemy import Column, Integer, String, DateTime, Float
 from sqlalchemy.sql import func
-from ..base import Base
+import enum
+from ..base import Base, JSONDocument
+
+class FileStatus(str, enum.Enum):
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
 
 class File(Base):
     __tablename__ = "files"
@@ -10,7 +16,10 @@ class File(Base):
     filepath = Column(String)
     filetype = Column(String)
     filesize = Column(Integer)
-    file_metadata = Column(JSON)
+    content_hash = Column(String, index=True, nullable=True)  # SHA-256 of the file content
+    file_metadata = Column(JSONDocument)
+    status = Column(String, default=FileStatus.READY)  # Metadata extraction state
+    error_message = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
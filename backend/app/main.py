@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
@@ -7,13 +7,21 @@ import platform
 import psutil
 from .api.routes import files, analysis, results
 from .core.config import settings
-from .db.base import engine, Base
+from .db.base import engine, Base, add_missing_columns
+from .processing.job_executor import executor
+from .processing.metadata_extractor import extractor
+from .api.http_cache import NotModified, not_modified_handler
+from .api.progress_stream import EventStreamGZipMiddleware
+from .api.request_metrics import RequestMetricsMiddleware
+from .core import metrics
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns()
 
 # Create upload directory if it doesn't exist
 os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+os.makedirs(settings.RESULTS_FOLDER, exist_ok=True)
 
 app = FastAPI(
     title="TPA Tool API",
@@ -30,11 +38,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON bodies (result series) for clients that accept gzip;
+# progress event streams are sent as they are
+app.add_middleware(EventStreamGZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
+# Request latency histograms, exposed on /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Conditional GET: answer 304 Not Modified for unchanged analyses
+app.add_exception_handler(NotModified, not_modified_handler)
+
 # Include routers
 app.include_router(files.router, prefix="/api/files", tags=["files"])
 app.include_router(analysis.router, prefix="/api/analysis", tags=["analysis"])
 app.include_router(results.router, prefix="/api/results", tags=["results"])
 
+@app.on_event("startup")
+def start_analysis_executor():
+    if settings.ANALYSIS_EXECUTOR_EMBEDDED:
+        executor.start()
+
+@app.on_event("startup")
+def start_metadata_extractor():
+    extractor.start()
+
+@app.on_event("shutdown")
+def stop_analysis_executor():
+    executor.stop()
+
+@app.on_event("shutdown")
+def stop_metadata_extractor():
+    extractor.stop()
+
 # Mount static files for uploads
 app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_FOLDER), name="uploads")
 
@@ -46,6 +81,12 @@ async def root():
 async def health_check():
     return {"status": "healthy", "version": "1.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Metrics in the Prometheus text format."""
+    body, content_type = metrics.render()
+    return Response(body, headers={"Content-Type": content_type})
+
 @app.get("/debug", tags=["debug"])
 async def debug_info():
     """Get debug information about the server environment"""
@@ -0,0 +1,117 @@
+import os
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from typing import Iterator, List, Optional
+from ..core.config import settings
+from .measurement import Measurement
+
+# Columnar cache of tabular uploads.
+#
+# CSV and Excel files are converted once, on ingest, into an Arrow IPC file
+# stored next to the original. Numeric columns are stored as float64 in record
+# batches of COLUMN_CACHE_BATCH_ROWS rows. Readers memory-map the cache and
+# touch only the columns they ask for, so repeated analyses skip text parsing.
+
+logger = logging.getLogger(__name__)
+
+CACHED_EXTENSIONS = (".csv", ".xlsx")
+
+def cache_path_for(file_path: str) -> str:
+    return f"{file_path}.arrow"
+
+def has_cache(file_path: str) -> bool:
+    return os.path.exists(cache_path_for(file_path))
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Store numeric columns as float64 so every batch shares one schema."""
+    return df.apply(lambda column: column.astype(np.float64) if pd.api.types.is_numeric_dtype(column) else column.astype(str))
+
+def _chunks(file_path: str) -> Iterator[pd.DataFrame]:
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext == ".csv":
+        yield from pd.read_csv(file_path, chunksize=settings.COLUMN_CACHE_BATCH_ROWS)
+    elif file_ext == ".xlsx":
+        yield pd.read_excel(file_path)
+    else:
+        raise ValueError(f"No columnar cache for '{file_ext}' files")
+
+def build_cache(file_path: str) -> str:
+    """
+    Convert a CSV/Excel file into its Arrow cache and return the cache path.
+
+    The cache is written to a temporary file that is renamed into place, so a
+    concurrent reader never sees a partial cache.
+    """
+    target = cache_path_for(file_path)
+    fd, staging = tempfile.mkstemp(dir=os.path.dirname(target) or ".", prefix=".cache-")
+    os.close(fd)
+    try:
+        writer, schema = None, None
+        try:
+            for chunk in _chunks(file_path):
+                table = pa.Table.from_pandas(_typed(chunk), preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pa.ipc.new_file(
+                        staging, schema,
+                        options=pa.ipc.IpcWriteOptions(compression=settings.COLUMN_CACHE_COMPRESSION)
+                    )
+                writer.write_table(table.cast(schema), max_chunksize=settings.COLUMN_CACHE_BATCH_ROWS)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError("File has no rows to cache")
+        os.replace(staging, target)
+    except BaseException:
+        os.remove(staging)
+        raise
+    return target
+
+def ensure_cache(file_path: str) -> bool:
+    """Build the cache if it is missing; False if the file cannot be cached."""
+    if has_cache(file_path):
+        return True
+    try:
+        build_cache(file_path)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not build columnar cache for {file_path}: {str(e)}")
+        return False
+
+def delete_cache(file_path: str):
+    try:
+        os.remove(cache_path_for(file_path))
+    except OSError:
+        pass  # No cache was built
+
+def _open(file_path: str) -> pa.RecordBatchFileReader:
+    return pa.ipc.open_file(pa.memory_map(cache_path_for(file_path), "r"))
+
+def column_names(file_path: str) -> List[str]:
+    """Columns of a cached file, read from the schema only."""
+    return _open(file_path).schema.names
+
+def _selected(names: List[str], columns: Optional[List[str]]) -> List[str]:
+    if columns is None:
+        return names
+    wanted = set(columns)
+    return [name for name in names if name in wanted]
+
+def read_measurement(file_path: str, columns: Optional[List[str]] = None, file_id: Optional[int] = None) -> Measurement:
+    """Read a cached table (only ``columns``, if given) into a measurement."""
+    reader = _open(file_path)
+    table = reader.read_all().select(_selected(reader.schema.names, columns))
+    return Measurement.from_dataframe(table.to_pandas(), file_id=file_id)
+
+def read_blocks(file_path: str, columns: Optional[List[str]] = None, file_id: Optional[int] = None) -> Iterator[Measurement]:
+    """Read a cached table batch by batch, as consecutive measurements."""
+    reader = _open(file_path)
+    selected = _selected(reader.schema.names, columns)
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        table = pa.Table.from_batches([batch]).select(selected)
+        yield Measurement.from_dataframe(table.to_pandas(), file_id=file_id)
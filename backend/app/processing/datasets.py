@@ -0,0 +1,167 @@
+import numpy as np
+import h5py
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Lazy handles on arrays stored in measurement files.
+#
+# FRF tensors can be far larger than memory, so loaders hand out dataset
+# handles instead of arrays. A handle knows its shape and dtype and reads only
+# the hyperslab that is asked for; contiguous, uncompressed HDF5 datasets are
+# memory-mapped directly. In-memory arrays (MAT v5, tables) expose the same
+# interface through ArrayDataset.
+
+Index = Union[int, slice, np.ndarray, Tuple[Any, ...]]
+
+def to_complex(values: np.ndarray) -> np.ndarray:
+    """Convert MATLAB v7.3 complex compound ``(real, imag)`` data to a complex array."""
+    names = values.dtype.names
+    if names and "real" in names and "imag" in names:
+        return values["real"] + 1j * values["imag"]
+    return values
+
+def _full_index(index: Index, ndim: int) -> Tuple[Any, ...]:
+    """Expand an index to one entry per axis."""
+    if not isinstance(index, tuple):
+        index = (index,)
+    return index + (slice(None),) * (ndim - len(index))
+
+class ArrayDataset:
+    """In-memory array behind the lazy dataset interface."""
+
+    def __init__(self, name: str, values: np.ndarray):
+        self.name = name
+        self._values = np.asarray(values)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self._values.shape
+
+    @property
+    def ndim(self) -> int:
+        return self._values.ndim
+
+    def read(self, index: Index = ()) -> np.ndarray:
+        return to_complex(self._values[index])
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.read(), dtype=dtype)
+
+class H5Dataset:
+    """
+    HDF5 dataset read on demand by hyperslab selection.
+
+    MATLAB v7.3 files store arrays column-major, so with ``matlab=True`` the axes
+    are presented in MATLAB order (reversed) and selections are translated.
+    """
+
+    def __init__(self, name: str, dataset: h5py.Dataset, file_path: str, matlab: bool = False):
+        self.name = name
+        self._dataset = dataset
+        self._matlab = matlab
+        self._memmap = self._map_contiguous(dataset, file_path)
+
+    @staticmethod
+    def _map_contiguous(dataset: h5py.Dataset, file_path: str) -> Optional[np.memmap]:
+        """Memory-map the dataset if it is stored as one contiguous block."""
+        if dataset.chunks is not None or dataset.compression is not None or dataset.size == 0:
+            return None
+        if dataset.dtype.hasobject:
+            return None
+        offset = dataset.id.get_offset()
+        if offset is None:
+            return None
+        return np.memmap(file_path, mode="r", dtype=dataset.dtype, offset=offset, shape=dataset.shape)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        shape = self._dataset.shape
+        return tuple(reversed(shape)) if self._matlab else shape
+
+    @property
+    def ndim(self) -> int:
+        return self._dataset.ndim
+
+    def read(self, index: Index = ()) -> np.ndarray:
+        index = _full_index(index, self.ndim)
+        if self._matlab:
+            index = tuple(reversed(index))
+        source = self._memmap if self._memmap is not None else self._dataset
+        values = np.asarray(source[index])
+        if self._matlab:
+            values = values.T
+        return to_complex(values)
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.read(), dtype=dtype)
+
+class FrequencyAxisView:
+    """Frequency-first access to a dataset whose frequency lines lie along ``axis``."""
+
+    def __init__(self, dataset, axis: int):
+        self.dataset = dataset
+        self.axis = axis
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        shape = list(self.dataset.shape)
+        return tuple([shape.pop(self.axis)] + shape)
+
+    def read_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Read the given frequency lines, frequency axis first.
+
+        Contiguous ascending rows become a single hyperslab; anything else is
+        read in ascending order (as HDF5 requires) and reordered in memory.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) == 0:
+            return np.moveaxis(self.dataset.read((slice(None),) * self.axis + (slice(0, 0),)), self.axis, 0)
+        if np.all(np.diff(rows) == 1):
+            selection = slice(int(rows[0]), int(rows[-1]) + 1)
+            values = self.dataset.read((slice(None),) * self.axis + (selection,))
+        else:
+            unique, inverse = np.unique(rows, return_inverse=True)
+            values = self.dataset.read((slice(None),) * self.axis + (unique,))
+            values = np.take(values, inverse, axis=self.axis)
+        return np.moveaxis(values, self.axis, 0)
+
+def frequency_view(dataset, n_freq: int, name: str) -> FrequencyAxisView:
+    """View a dataset frequency-first, locating the axis whose length matches the grid."""
+    shape = dataset.shape
+    if len(shape) > 0 and shape[0] == n_freq:
+        return FrequencyAxisView(dataset, 0)
+    axes = [i for i, size in enumerate(shape) if size == n_freq]
+    if not axes:
+        raise ValueError(f"'{name}' with shape {shape} has no axis matching {n_freq} frequency lines")
+    return FrequencyAxisView(dataset, axes[-1])
+
+class DatasetStore:
+    """Keeps the HDF5 files behind lazy datasets open for the duration of an analysis."""
+
+    def __init__(self):
+        self._files: Dict[str, h5py.File] = {}
+
+    def open(self, file_path: str) -> h5py.File:
+        if file_path not in self._files:
+            self._files[file_path] = h5py.File(file_path, "r")
+        return self._files[file_path]
+
+    def datasets(self, file_path: str, matlab: bool = False) -> Dict[str, H5Dataset]:
+        """Lazy handles on the top-level datasets of a file."""
+        f = self.open(file_path)
+        return {
+            key: H5Dataset(key, f[key], file_path, matlab=matlab)
+            for key in f
+            if isinstance(f[key], h5py.Dataset)
+        }
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
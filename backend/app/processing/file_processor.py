@@ -1,10 +1,10 @@
 import os
-import pandas as pd
-import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import json
-import scipy.io as sio
-import h5py
+
+# The API process imports this module for validate_file_type only, so the
+# readers import pandas, scipy.io and h5py themselves: parsing happens in
+# worker processes, whose fork server preloads them.
 
 def validate_file_type(filename: str) -> bool:
     """Validate if the file type is supported."""
@@ -38,28 +38,38 @@ def process_file(file_path: str) -> Dict[str, Any]:
     
     return metadata
 
-def process_csv(file_path: str) -> Dict[str, Any]:
-    """Process CSV file and extract metadata."""
-    df = pd.read_csv(file_path, nrows=5)  # Read first few rows to get structure
-    
+# Bytes read per block when scanning text files
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+
+def _count_data_rows(file_path: str) -> int:
+    """Count data rows (excluding the header) by scanning raw bytes for newlines."""
+    newlines = 0
+    last_byte = b""
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            newlines += block.count(b"\n")
+            last_byte = block[-1:]
+    lines = newlines + (1 if last_byte and last_byte != b"\n" else 0)
+    return max(lines - 1, 0)
+
+def _table_metadata(columns: List[str], rows: int, frequency_range: Optional[Dict[str, float]]) -> Dict[str, Any]:
+    """Metadata shared by tabular (CSV/Excel) files."""
     metadata = {
-        "columns": df.columns.tolist(),
-        "rows": len(pd.read_csv(file_path, usecols=[0])),  # Count rows efficiently
-        "data_type": "time_domain" if "time" in df.columns else "frequency_domain",
+        "columns": columns,
+        "rows": rows,
+        "data_type": "time_domain" if "time" in columns else "frequency_domain",
         "frequency_range": None,
         "channels": []
     }
     
-    # Try to detect frequency range if it's frequency domain data
-    if metadata["data_type"] == "frequency_domain" and "frequency" in df.columns:
-        freq_col = df["frequency"]
-        metadata["frequency_range"] = {
-            "min": float(freq_col.min()),
-            "max": float(freq_col.max())
-        }
+    if metadata["data_type"] == "frequency_domain":
+        metadata["frequency_range"] = frequency_range
     
     # Detect channels
-    for col in df.columns:
+    for col in columns:
         if col not in ["time", "frequency"]:
             metadata["channels"].append({
                 "name": col,
@@ -68,40 +78,55 @@ def process_csv(file_path: str) -> Dict[str, Any]:
     
     return metadata
 
-def process_excel(file_path: str) -> Dict[str, Any]:
-    """Process Excel file and extract metadata."""
-    # Read first sheet by default
-    df = pd.read_excel(file_path, nrows=5)
+def process_csv(file_path: str) -> Dict[str, Any]:
+    """Process CSV file and extract metadata in a single pass over the file."""
+    import pandas as pd
+
+    columns = pd.read_csv(file_path, nrows=0).columns.tolist()
     
-    metadata = {
-        "columns": df.columns.tolist(),
-        "rows": len(pd.read_excel(file_path, usecols=[0])),
-        "sheets": pd.ExcelFile(file_path).sheet_names,
-        "data_type": "time_domain" if "time" in df.columns else "frequency_domain",
-        "frequency_range": None,
-        "channels": []
-    }
+    if "frequency" in columns and "time" not in columns:
+        # Frequency range over the full column; rows are counted from the same pass
+        rows = 0
+        f_min, f_max = float("inf"), float("-inf")
+        for chunk in pd.read_csv(file_path, usecols=["frequency"], chunksize=1_000_000):
+            rows += len(chunk)
+            if len(chunk):
+                f_min = min(f_min, float(chunk["frequency"].min()))
+                f_max = max(f_max, float(chunk["frequency"].max()))
+        frequency_range = {"min": f_min, "max": f_max} if rows else None
+    else:
+        rows = _count_data_rows(file_path)
+        frequency_range = None
     
-    # Try to detect frequency range if it's frequency domain data
-    if metadata["data_type"] == "frequency_domain" and "frequency" in df.columns:
-        freq_col = df["frequency"]
-        metadata["frequency_range"] = {
-            "min": float(freq_col.min()),
-            "max": float(freq_col.max())
+    return _table_metadata(columns, rows, frequency_range)
+
+def process_excel(file_path: str) -> Dict[str, Any]:
+    """Process Excel file and extract metadata, opening the workbook once."""
+    import pandas as pd
+
+    with pd.ExcelFile(file_path) as workbook:
+        sheets = workbook.sheet_names
+        # Read first sheet by default
+        df = workbook.parse(sheets[0])
+    
+    columns = df.columns.tolist()
+    frequency_range = None
+    if "frequency" in df.columns and len(df):
+        frequency_range = {
+            "min": float(df["frequency"].min()),
+            "max": float(df["frequency"].max())
         }
     
-    # Detect channels
-    for col in df.columns:
-        if col not in ["time", "frequency"]:
-            metadata["channels"].append({
-                "name": col,
-                "type": detect_channel_type(col)
-            })
+    metadata = _table_metadata(columns, len(df), frequency_range)
+    metadata["sheets"] = sheets
     
     return metadata
 
 def process_matlab(file_path: str) -> Dict[str, Any]:
     """Process MATLAB file and extract metadata."""
+    import h5py
+    import scipy.io as sio
+
     try:
         # Try loading with scipy.io
         mat_data = sio.loadmat(file_path)
@@ -160,6 +185,8 @@ def process_matlab(file_path: str) -> Dict[str, Any]:
 
 def process_hdf5(file_path: str) -> Dict[str, Any]:
     """Process HDF5 file and extract metadata."""
+    import h5py
+
     with h5py.File(file_path, 'r') as f:
         keys = list(f.keys())
         
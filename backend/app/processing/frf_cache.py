@@ -0,0 +1,166 @@
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import weakref
+import numpy as np
+from typing import Optional, Tuple
+from ..core.config import settings
+from .tpa_solver import ProjectedResponses
+
+# Persistent cache of FRF decompositions.
+#
+# The batched SVD of the indicator FRF tensor dominates the cost of a
+# matrix-inversion analysis. The SVD solvers and the regularization sweep only
+# use its left singular vectors to project the indicator responses, so an entry
+# holds the singular values, the right singular vectors and the projected
+# responses (``tpa_solver.ProjectedResponses``) rather than the full ``u``
+# factor, which is larger than the FRF tensor itself. What-if reruns that change
+# the selected paths or targets, the solver or the regularization level reuse
+# the stored entry.
+#
+# Entries are keyed on the SHA-256 of the FRF file content, the variable
+# holding the FRF, the frequency grid and the indicator responses. An entry is a
+# directory of .npy files, filled chunk by chunk in a staging directory that is
+# renamed into place once complete, and memory-mapped on reads like the result
+# store. The modification time of an entry records its last use; once the cache
+# exceeds FRF_CACHE_MAX_BYTES the least recently used entries are removed.
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of an entry changes, so old entries are never read
+CACHE_VERSION = 2
+
+def enabled() -> bool:
+    return settings.FRF_CACHE_MAX_BYTES > 0
+
+def cache_key(
+    content_hash: str,
+    variable: str,
+    shape: Tuple[int, ...],
+    frequencies: np.ndarray,
+    responses_digest: str
+) -> str:
+    """Key of the decomposition of ``variable`` of a file over the lines at ``frequencies``."""
+    digest = hashlib.sha256(f"{CACHE_VERSION}:{content_hash}:{variable}:{tuple(shape)}:{responses_digest}".encode())
+    digest.update(np.ascontiguousarray(frequencies, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def _entry_path(key: str) -> str:
+    return os.path.join(settings.FRF_CACHE_FOLDER, key)
+
+def open_decomposition(key: str, n_lines: int) -> Optional[ProjectedResponses]:
+    """Memory-map a stored decomposition of ``n_lines`` lines, or None if there is none."""
+    path = _entry_path(key)
+    try:
+        decomposition = ProjectedResponses(*(
+            np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r", allow_pickle=False)
+            for name in ProjectedResponses._fields
+        ))
+        # Mark the entry as recently used
+        os.utime(path)
+    except (OSError, ValueError):
+        return None  # Not cached, or evicted or damaged since
+    if len(decomposition.s) != n_lines:
+        return None
+    return decomposition
+
+def read_lines(decomposition: ProjectedResponses, lines: slice) -> ProjectedResponses:
+    """Lines of a memory-mapped decomposition, read into memory."""
+    return ProjectedResponses(*(np.array(values[lines]) for values in decomposition))
+
+def entry_bytes(n_lines: int, n_responses: int, n_paths: int) -> int:
+    rank = min(n_responses, n_paths)
+    return 16 * n_lines * rank * (n_paths + 1) + 8 * n_lines * (rank + 1)
+
+class DecompositionWriter:
+    """
+    Fills a new cache entry chunk by chunk.
+
+    The entry only becomes visible on ``commit``; a writer that is dropped
+    without committing (e.g. because the analysis failed or was cancelled)
+    removes its staging directory.
+    """
+
+    def __init__(self, key: str, n_lines: int, n_responses: int, n_paths: int):
+        self.key = key
+        rank = min(n_responses, n_paths)
+        os.makedirs(settings.FRF_CACHE_FOLDER, exist_ok=True)
+        self._staging = tempfile.mkdtemp(prefix=f".{key[:16]}-", dir=settings.FRF_CACHE_FOLDER)
+        self._cleanup = weakref.finalize(self, shutil.rmtree, self._staging, ignore_errors=True)
+        self._arrays = ProjectedResponses(
+            s=self._create("s", (n_lines, rank), np.float64),
+            vh=self._create("vh", (n_lines, rank, n_paths), np.complex128),
+            projection=self._create("projection", (n_lines, rank), np.complex128),
+            outside=self._create("outside", (n_lines,), np.float64),
+        )
+
+    def _create(self, name: str, shape: Tuple[int, ...], dtype) -> np.memmap:
+        return np.lib.format.open_memmap(os.path.join(self._staging, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+
+    def write(self, lines: slice, decomposition: ProjectedResponses):
+        for target, values in zip(self._arrays, decomposition):
+            target[lines] = values
+
+    def commit(self):
+        """Publish the entry and evict least recently used entries over the budget."""
+        for array in self._arrays:
+            array.flush()
+        self._arrays = None
+        try:
+            os.replace(self._staging, _entry_path(self.key))
+        except OSError:
+            pass  # Another analysis stored the same entry first
+        self._cleanup()
+        evict()
+
+    def discard(self):
+        self._arrays = None
+        self._cleanup()
+
+def writer(key: str, n_lines: int, n_responses: int, n_paths: int) -> Optional[DecompositionWriter]:
+    """A writer for a new entry, or None if the entry could never fit the cache."""
+    if entry_bytes(n_lines, n_responses, n_paths) > settings.FRF_CACHE_MAX_BYTES:
+        return None
+    try:
+        return DecompositionWriter(key, n_lines, n_responses, n_paths)
+    except OSError as e:
+        # The cache is an optimisation; never fail the analysis over it
+        logger.warning(f"Could not create FRF cache entry: {str(e)}")
+        return None
+
+def _directory_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def evict(max_bytes: Optional[int] = None):
+    """Remove least recently used entries until the cache fits ``max_bytes``."""
+    if max_bytes is None:
+        max_bytes = settings.FRF_CACHE_MAX_BYTES
+    try:
+        names = os.listdir(settings.FRF_CACHE_FOLDER)
+    except FileNotFoundError:
+        return
+
+    entries = []
+    for name in names:
+        path = os.path.join(settings.FRF_CACHE_FOLDER, name)
+        try:
+            modified = os.stat(path).st_mtime
+            if name.startswith("."):
+                # Staging directory of a job that was killed before it could clean up
+                if time.time() - modified > settings.ANALYSIS_TIMEOUT:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            entries.append((modified, _directory_size(path), path))
+        except OSError:
+            continue  # Removed concurrently
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        logger.info(f"Evicted FRF cache entry {os.path.basename(path)}")
@@ -0,0 +1,318 @@
+import os
+import uuid
+import socket
+import multiprocessing
+import threading
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+from multiprocessing.connection import Connection
+from typing import Dict, Optional, Tuple
+from ..db.base import SessionLocal
+from ..db.models.analysis import Analysis as AnalysisModel, AnalysisStatus
+from ..core.config import settings
+from ..core import metrics
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def process_context():
+    """Multiprocessing context for job and file processing workers.
+
+    The fork server is started once with the engine and file processing
+    preloaded, so each worker gets a clean process without paying the scientific
+    stack import again and without inheriting the API's threads and database
+    connections.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["app.processing.tpa_engine", "app.processing.file_processor"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+def _run_job(analysis_id: int, stats_pipe: Connection):
+    """Entry point of a job process: run one claimed analysis with its own session.
+
+    The job's stats are sent back through ``stats_pipe`` for the executor to
+    record as metrics.
+    """
+    from .tpa_engine import run_analysis
+
+    db = SessionLocal()
+    try:
+        db_analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
+        if db_analysis is None:
+            logger.error(f"Analysis {analysis_id} not found")
+            return
+        stats = run_analysis(analysis_id, db_analysis.file_ids, db_analysis.parameters, db)
+        if stats is not None:
+            stats_pipe.send(stats)
+    finally:
+        stats_pipe.close()
+        db.close()
+
+class AnalysisExecutor:
+    """
+    Runs pending analyses in separate processes.
+
+    A dispatcher thread claims PENDING rows from the ``analyses`` table (oldest
+    first) with a conditional update, so several executors can share one
+    database without running a job twice. Each job runs in its own process,
+    at most ``workers`` at a time, and is killed once it exceeds ``timeout``.
+    Cancelled jobs stop on their own at the engine's next progress update and
+    are killed if they have not within ``cancel_grace`` seconds.
+
+    A claim records the executor's ``worker_id`` and a heartbeat that is renewed
+    every ``heartbeat_interval`` seconds while the job runs. RUNNING rows whose
+    heartbeat is older than ``claim_ttl`` belong to an executor that crashed or
+    was restarted; any executor fails them (or cancels them, if cancellation was
+    requested) on start and on every renewal.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.ANALYSIS_WORKERS,
+        timeout: int = settings.ANALYSIS_TIMEOUT,
+        poll_interval: float = settings.ANALYSIS_POLL_INTERVAL,
+        cancel_grace: float = settings.ANALYSIS_CANCEL_GRACE,
+        heartbeat_interval: float = settings.ANALYSIS_HEARTBEAT_INTERVAL,
+        claim_ttl: float = settings.ANALYSIS_CLAIM_TTL
+    ):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.cancel_grace = cancel_grace
+        self.heartbeat_interval = heartbeat_interval
+        self.claim_ttl = max(claim_ttl, 2 * heartbeat_interval)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._next_heartbeat = 0.0
+        self._jobs: Dict[int, Tuple[multiprocessing.Process, float, Connection]] = {}
+        self._cancel_deadlines: Dict[int, float] = {}
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._context = None
+
+    @property
+    def running(self) -> int:
+        """Number of job processes currently alive."""
+        return len(self._jobs)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._context = process_context()
+        self._stopping.clear()
+        self._next_heartbeat = 0.0  # Renew and recover orphaned analyses right away
+        self._thread = threading.Thread(target=self._dispatch_loop, name="analysis-executor", daemon=True)
+        self._thread.start()
+        logger.info(f"Analysis executor started with {self.workers} workers")
+
+    def stop(self):
+        """Stop dispatching and kill running jobs; they are marked failed."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+        for analysis_id in list(self._jobs):
+            self._kill(analysis_id, "Analysis aborted: executor shut down")
+        logger.info("Analysis executor stopped")
+
+    def notify(self):
+        """Wake the dispatcher, e.g. right after a new analysis was queued."""
+        self._wakeup.set()
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            try:
+                self._reap()
+                self._heartbeat()
+                self._claim_and_start()
+            except Exception as e:
+                logger.error(f"Analysis executor error: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _reap(self):
+        """Collect finished jobs and kill the ones past their deadline."""
+        now = time.monotonic()
+        for analysis_id, (process, deadline, stats_pipe) in list(self._jobs.items()):
+            if not process.is_alive():
+                process.join()
+                del self._jobs[analysis_id]
+                self._cancel_deadlines.pop(analysis_id, None)
+                self._record_stats(stats_pipe)
+                if process.exitcode != 0:
+                    metrics.ANALYSES.labels(status=AnalysisStatus.FAILED.value).inc()
+                    self._mark_failed(analysis_id, f"Analysis worker exited with code {process.exitcode}")
+            elif now > deadline:
+                logger.warning(f"Analysis {analysis_id} timed out after {self.timeout} seconds")
+                self._kill(analysis_id, f"Analysis timed out after {self.timeout} seconds")
+        self._reap_cancelled(now)
+
+    def _reap_cancelled(self, now: float):
+        """Kill cancelled jobs that did not stop by themselves within the grace period."""
+        if not self._jobs:
+            return
+        db = SessionLocal()
+        try:
+            cancelled = (
+                db.query(AnalysisModel.id)
+                .filter(AnalysisModel.id.in_(list(self._jobs)), AnalysisModel.cancel_requested.is_(True))
+                .all()
+            )
+        finally:
+            db.close()
+        for (analysis_id,) in cancelled:
+            deadline = self._cancel_deadlines.setdefault(analysis_id, now + self.cancel_grace)
+            if now > deadline:
+                logger.warning(f"Analysis {analysis_id} did not stop within {self.cancel_grace} seconds of cancellation")
+                self._kill(analysis_id, "Analysis cancelled", AnalysisStatus.CANCELLED)
+
+    def _heartbeat(self):
+        """Renew the claims on this executor's jobs and fail orphaned ones, every heartbeat interval."""
+        now = time.monotonic()
+        if now < self._next_heartbeat:
+            return
+        self._next_heartbeat = now + self.heartbeat_interval
+
+        current = datetime.now(timezone.utc)
+        expired = current - timedelta(seconds=self.claim_ttl)
+        db = SessionLocal()
+        try:
+            if self._jobs:
+                db.query(AnalysisModel).filter(
+                    AnalysisModel.id.in_(list(self._jobs)),
+                    AnalysisModel.worker_id == self.worker_id,
+                    AnalysisModel.status == AnalysisStatus.RUNNING
+                ).update({AnalysisModel.heartbeat_at: current}, synchronize_session=False)
+                db.commit()
+
+            # Conditional updates: only one executor moves an orphaned row to its final state
+            orphaned = (
+                AnalysisModel.status == AnalysisStatus.RUNNING,
+                AnalysisModel.heartbeat_at.is_(None) | (AnalysisModel.heartbeat_at < expired)
+            )
+            for final_status, cancel_requested, reason in (
+                (AnalysisStatus.CANCELLED, True, "Analysis cancelled"),
+                (AnalysisStatus.FAILED, None, "Analysis aborted: its worker stopped responding"),
+            ):
+                query = db.query(AnalysisModel).filter(*orphaned)
+                if cancel_requested:
+                    query = query.filter(AnalysisModel.cancel_requested.is_(True))
+                recovered = query.update(
+                    {AnalysisModel.status: final_status, AnalysisModel.error_message: reason},
+                    synchronize_session=False
+                )
+                db.commit()
+                if recovered:
+                    metrics.ANALYSES.labels(status=final_status.value).inc(recovered)
+                    logger.warning(f"Marked {recovered} orphaned running analyses as {final_status.value}")
+        finally:
+            db.close()
+
+    def _kill(self, analysis_id: int, reason: str, final_status: AnalysisStatus = AnalysisStatus.FAILED):
+        process, _, stats_pipe = self._jobs.pop(analysis_id)
+        self._cancel_deadlines.pop(analysis_id, None)
+        process.kill()
+        process.join()
+        stats_pipe.close()
+        metrics.ANALYSES.labels(status=final_status.value).inc()
+        self._mark_failed(analysis_id, reason, final_status)
+
+    def _record_stats(self, stats_pipe: Connection):
+        try:
+            if stats_pipe.poll():
+                metrics.record_job_stats(stats_pipe.recv())
+        except (EOFError, OSError):
+            pass  # The job died before reporting
+        finally:
+            stats_pipe.close()
+
+    def _claim_and_start(self):
+        free = self.workers - len(self._jobs)
+        if free <= 0:
+            return
+
+        claimed_at = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            pending = (
+                db.query(AnalysisModel.id)
+                .filter(AnalysisModel.status == AnalysisStatus.PENDING)
+                .order_by(AnalysisModel.created_at, AnalysisModel.id)
+                .limit(free)
+                .all()
+            )
+            claimed = []
+            for (analysis_id,) in pending:
+                # Only one executor wins the PENDING -> RUNNING transition
+                updated = (
+                    db.query(AnalysisModel)
+                    .filter(AnalysisModel.id == analysis_id, AnalysisModel.status == AnalysisStatus.PENDING)
+                    .update(
+                        {
+                            AnalysisModel.status: AnalysisStatus.RUNNING,
+                            AnalysisModel.worker_id: self.worker_id,
+                            AnalysisModel.heartbeat_at: claimed_at
+                        },
+                        synchronize_session=False
+                    )
+                )
+                db.commit()
+                if updated:
+                    claimed.append(analysis_id)
+        finally:
+            db.close()
+
+        for analysis_id in claimed:
+            stats_pipe, job_pipe = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=_run_job, args=(analysis_id, job_pipe), name=f"analysis-{analysis_id}", daemon=True
+            )
+            try:
+                process.start()
+            except Exception as e:
+                logger.error(f"Failed to start worker for analysis {analysis_id}: {str(e)}")
+                stats_pipe.close()
+                self._mark_failed(analysis_id, f"Failed to start analysis worker: {str(e)}")
+                continue
+            finally:
+                job_pipe.close()  # Only the job writes to it
+            self._jobs[analysis_id] = (process, time.monotonic() + self.timeout, stats_pipe)
+            logger.info(f"Analysis {analysis_id} dispatched to process {process.pid}")
+
+    def _mark_failed(self, analysis_id: int, reason: str, final_status: AnalysisStatus = AnalysisStatus.FAILED):
+        """Mark a job failed (or ``final_status``) unless it already reached a final state."""
+        db = SessionLocal()
+        try:
+            db.query(AnalysisModel).filter(
+                AnalysisModel.id == analysis_id,
+                AnalysisModel.status.in_([AnalysisStatus.PENDING, AnalysisStatus.RUNNING])
+            ).update(
+                {AnalysisModel.status: final_status, AnalysisModel.error_message: reason},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+def pending_count(db) -> int:
+    """Number of analyses waiting to be claimed."""
+    return db.query(AnalysisModel).filter(AnalysisModel.status == AnalysisStatus.PENDING).count()
+
+executor = AnalysisExecutor()
+
+if __name__ == "__main__":
+    # Standalone worker: python -m app.processing.job_executor
+    from prometheus_client import start_http_server
+    start_http_server(settings.METRICS_PORT, registry=metrics.registry)
+    executor.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        executor.stop()
@@ -0,0 +1,131 @@
+import re
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+from .file_processor import detect_channel_type
+
+# Axis columns recognised in tabular measurements
+AXIS_COLUMNS = ("frequency", "time")
+
+# Unit suffix in a column header, e.g. "acc1 [m/s^2]" or "mic (Pa)"
+_UNIT_PATTERN = re.compile(r"[\[(]\s*([^\])]+?)\s*[\])]\s*$")
+
+@dataclass
+class Channel:
+    name: str
+    type: str = "unknown"
+    unit: Optional[str] = None
+
+@dataclass
+class Measurement:
+    """
+    Multi-channel measurement sampled on a shared time or frequency axis.
+
+    ``values`` is a C-contiguous (n_channels, n_samples) array, so every channel
+    is a contiguous row that can be handed to NumPy without copying. Complex
+    spectra are stored as complex128, everything else as float64.
+    """
+    axis_name: str
+    axis: np.ndarray
+    channels: List[Channel]
+    values: np.ndarray
+    file_id: Optional[int] = None
+    _index: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.values.shape != (len(self.channels), len(self.axis)):
+            raise ValueError(
+                f"Values shape {self.values.shape} does not match {len(self.channels)} channels "
+                f"x {len(self.axis)} samples"
+            )
+        self._index = {channel.name: i for i, channel in enumerate(self.channels)}
+
+    @property
+    def data_type(self) -> str:
+        return "time_domain" if self.axis_name == "time" else "frequency_domain"
+
+    @property
+    def channel_names(self) -> List[str]:
+        return [channel.name for channel in self.channels]
+
+    @property
+    def sample_rate(self) -> Optional[float]:
+        """Sampling rate of a time-domain measurement, from the mean time step."""
+        if self.axis_name != "time" or len(self.axis) < 2:
+            return None
+        return float((len(self.axis) - 1) / (self.axis[-1] - self.axis[0]))
+
+    def channel(self, name: str) -> np.ndarray:
+        """Samples of one channel (a view, not a copy)."""
+        return self.values[self._index[name]]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, file_id: Optional[int] = None) -> "Measurement":
+        """
+        Build a measurement from a table with a ``time`` or ``frequency`` column.
+
+        Numeric columns become channels; ``<name>_re``/``<name>_im`` pairs are
+        combined into one complex channel. Units are taken from a trailing
+        ``[unit]`` or ``(unit)`` in the header. Tables without an axis column are
+        indexed by sample number.
+        """
+        axis_name = next((name for name in AXIS_COLUMNS if name in df.columns), None)
+        if axis_name is not None:
+            axis = np.ascontiguousarray(df[axis_name].to_numpy(dtype=np.float64))
+        else:
+            axis = np.arange(len(df), dtype=np.float64)
+
+        numeric = [
+            column for column in df.columns
+            if column not in AXIS_COLUMNS and pd.api.types.is_numeric_dtype(df[column])
+        ]
+        complex_pairs = {
+            column[:-3] for column in numeric
+            if column.endswith("_re") and f"{column[:-3]}_im" in numeric
+        }
+        real_columns = [
+            column for column in numeric
+            if not (column.endswith(("_re", "_im")) and column[:-3] in complex_pairs)
+        ]
+
+        channels = [cls._channel(column) for column in real_columns]
+        channels += [cls._channel(name) for name in sorted(complex_pairs)]
+
+        if complex_pairs:
+            values = np.empty((len(channels), len(df)), dtype=np.complex128)
+            for i, column in enumerate(real_columns):
+                values[i] = df[column].to_numpy(dtype=np.float64)
+            for i, name in enumerate(sorted(complex_pairs), start=len(real_columns)):
+                values[i].real = df[f"{name}_re"].to_numpy(dtype=np.float64)
+                values[i].imag = df[f"{name}_im"].to_numpy(dtype=np.float64)
+        elif real_columns:
+            # A homogeneous float frame is stored column-blocked, so the transpose is
+            # usually a view of pandas' own buffer and no copy is made here.
+            values = np.ascontiguousarray(df[real_columns].to_numpy(dtype=np.float64).T)
+        else:
+            values = np.empty((0, len(df)), dtype=np.float64)
+
+        return cls(axis_name or "sample", axis, channels, values, file_id=file_id)
+
+    @staticmethod
+    def _channel(header: str) -> Channel:
+        match = _UNIT_PATTERN.search(header)
+        unit = match.group(1) if match else None
+        return Channel(name=header, type=detect_channel_type(header), unit=unit)
+
+def read_csv_measurement(file_path: str, file_id: Optional[int] = None) -> Measurement:
+    """Read a CSV export into a measurement."""
+    return Measurement.from_dataframe(pd.read_csv(file_path), file_id=file_id)
+
+def read_excel_measurement(file_path: str, file_id: Optional[int] = None) -> Measurement:
+    """Read the first sheet of an Excel workbook into a measurement."""
+    return Measurement.from_dataframe(pd.read_excel(file_path), file_id=file_id)
+
+def read_csv_blocks(file_path: str, block_rows: int, file_id: Optional[int] = None) -> Iterator[Measurement]:
+    """Read a CSV export as consecutive measurements of at most ``block_rows`` samples."""
+    for chunk in pd.read_csv(file_path, chunksize=block_rows):
+        yield Measurement.from_dataframe(chunk, file_id=file_id)
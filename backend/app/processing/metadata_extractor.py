@@ -0,0 +1,151 @@
+import os
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional
+from ..db.base import SessionLocal
+from ..db.models.file import File as FileModel, FileStatus
+from ..core.config import settings
+from ..core import metrics
+from .job_executor import process_context
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def extract_metadata(file_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Entry point of a worker process: extract the metadata of one uploaded file.
+
+    Returns the stats of the extraction for the parent to record as metrics.
+    """
+    # Imported here so the API process, which only submits files, never loads them
+    from .file_processor import process_file
+    from . import column_cache
+
+    stats = metrics.new_job_stats()
+    db = SessionLocal()
+    try:
+        db_file = db.query(FileModel).filter(FileModel.id == file_id).first()
+        if db_file is None:
+            logger.error(f"File {file_id} not found")
+            return None
+
+        file_ext = os.path.splitext(db_file.filepath)[1].lower()
+        try:
+            stats["bytes_read"][file_ext.lstrip(".")] = os.path.getsize(db_file.filepath)
+            metadata = process_file(db_file.filepath)
+            # Convert tables once into the columnar cache read by analyses
+            if file_ext in column_cache.CACHED_EXTENSIONS:
+                column_cache.ensure_cache(db_file.filepath)
+        except Exception as e:
+            logger.error(f"Error processing file {file_id}: {str(e)}")
+            db_file.status = FileStatus.FAILED
+            db_file.error_message = str(e)
+        else:
+            db_file.file_metadata = metadata
+            db_file.status = FileStatus.READY
+            db_file.error_message = None
+        db.commit()
+        return stats
+    finally:
+        db.close()
+
+class MetadataExtractor:
+    """
+    Extracts metadata of uploaded files in a pool of worker processes.
+
+    Uploads are stored and recorded as PROCESSING right away; the parse runs
+    here, off the request path, and moves the record to READY or FAILED.
+    """
+
+    def __init__(self, workers: int = settings.METADATA_WORKERS):
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self._pool = self._new_pool()
+        logger.info(f"Metadata extractor started with {self.workers} workers")
+        self._resume()
+
+    def stop(self):
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        logger.info("Metadata extractor stopped")
+
+    def submit(self, file_id: int):
+        """Queue a PROCESSING file for metadata extraction."""
+        if self._pool is None:
+            self.start()
+        pool = self._pool
+        try:
+            self._submit_to(pool, file_id)
+        except BrokenProcessPool:
+            # A worker of the pool died earlier; this file is not at fault, so retry on a new pool
+            pool = self._replace_pool(pool)
+            try:
+                self._submit_to(pool, file_id)
+            except BrokenProcessPool as e:
+                self._mark_failed(file_id, str(e))
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context())
+
+    def _submit_to(self, pool: ProcessPoolExecutor, file_id: int):
+        future = pool.submit(extract_metadata, file_id)
+        future.add_done_callback(lambda f: self._done(file_id, pool, f))
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> ProcessPoolExecutor:
+        """Swap a broken pool for a new one, once however many of its jobs report it."""
+        with self._lock:
+            if self._pool is broken:
+                broken.shutdown(wait=False)
+                self._pool = self._new_pool()
+                logger.warning("Metadata worker pool broke; started a new one")
+            return self._pool
+
+    def _resume(self):
+        """Requeue files left in PROCESSING, e.g. by a restart during extraction."""
+        db = SessionLocal()
+        try:
+            pending = db.query(FileModel.id).filter(FileModel.status == FileStatus.PROCESSING).all()
+        finally:
+            db.close()
+        for (file_id,) in pending:
+            self.submit(file_id)
+
+    def _done(self, file_id: int, pool: ProcessPoolExecutor, future: Future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is None:
+            if future.result() is not None:
+                metrics.record_job_stats(future.result(), operation="metadata")
+            return
+        # The worker itself failed (e.g. was killed); the record would stay PROCESSING
+        logger.error(f"Metadata worker for file {file_id} failed: {str(error)}")
+        self._mark_failed(file_id, str(error))
+        if isinstance(error, BrokenProcessPool) and self._pool is not None:
+            # A dead worker breaks the whole pool; later uploads need a working one
+            self._replace_pool(pool)
+
+    def _mark_failed(self, file_id: int, error: str):
+        db = SessionLocal()
+        try:
+            db.query(FileModel).filter(
+                FileModel.id == file_id, FileModel.status == FileStatus.PROCESSING
+            ).update(
+                {FileModel.status: FileStatus.FAILED, FileModel.error_message: f"Metadata extraction failed: {error}"},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+extractor = MetadataExtractor()
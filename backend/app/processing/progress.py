@@ -0,0 +1,116 @@
+import time
+import logging
+from typing import Any, Dict, Optional, Tuple
+from ..db.base import SessionLocal
+from ..db.models.analysis import Analysis as AnalysisModel
+from ..core.config import settings
+from ..core.metrics import new_job_stats
+
+# Progress and cancellation of a running analysis.
+#
+# The engine reports the stage it is in and how far through it it is; the
+# reporter turns that into an overall percentage and an ETA and stores it in
+# the ``progress`` column of the analysis, at most once per
+# PROGRESS_UPDATE_INTERVAL seconds (and on every stage change), so progress
+# costs a handful of small writes however many frequency chunks are solved.
+# The API streams these rows to watching clients.
+#
+# Each write also reads the ``cancel_requested`` flag set by the cancel
+# endpoint, so the engine's progress calls between chunks double as
+# cancellation points.
+#
+# The reporter also collects the job's stats (time per stage, bytes read,
+# cache lookups), which the executor records as metrics once the job ends.
+
+logger = logging.getLogger(__name__)
+
+# Share of the overall progress taken by each stage, in execution order
+STAGES: Dict[str, Tuple[float, float]] = {
+    "loading": (0.0, 0.15),
+    "spectral_estimation": (0.15, 0.35),
+    "inversion": (0.35, 0.8),
+    "contributions": (0.8, 0.9),
+    "persistence": (0.9, 1.0),
+}
+
+class AnalysisCancelled(Exception):
+    """Raised at a progress update once cancellation of the analysis was requested."""
+
+class ProgressReporter:
+    """Throttled writer of an analysis' progress that also polls for cancellation."""
+
+    def __init__(self, analysis_id: int, interval: float = settings.PROGRESS_UPDATE_INTERVAL):
+        self.analysis_id = analysis_id
+        self.interval = interval
+        self.stats: Dict[str, Any] = new_job_stats()
+        self._started = time.monotonic()
+        self._last_write = 0.0
+        self._stage: Optional[str] = None
+        self._stage_started = self._started
+        self._done = 0.0
+
+    def update(self, stage: str, fraction: float = 0.0):
+        """
+        Report ``fraction`` (0..1) of ``stage`` done.
+
+        Raises ``AnalysisCancelled`` if cancellation was requested; callers
+        must leave nothing half-written when it propagates.
+        """
+        now = time.monotonic()
+        if stage == self._stage and now - self._last_write < self.interval:
+            return
+        if stage != self._stage:
+            self._end_stage(now)
+        self._stage = stage
+        self._last_write = now
+
+        # Stages of different files may interleave; the overall percentage never goes back
+        start, end = STAGES[stage]
+        self._done = max(self._done, start + (end - start) * min(max(fraction, 0.0), 1.0))
+        elapsed = now - self._started
+        progress = {
+            "stage": stage,
+            "percent": round(100 * self._done, 1),
+            "eta_seconds": round(elapsed * (1 - self._done) / self._done, 1) if self._done > 0 else None,
+        }
+        if self._write(progress):
+            raise AnalysisCancelled(f"Analysis {self.analysis_id} was cancelled")
+
+    def add_bytes_read(self, file_type: str, n_bytes: int):
+        bytes_read = self.stats["bytes_read"]
+        bytes_read[file_type] = bytes_read.get(file_type, 0) + n_bytes
+
+    def count_cache(self, cache: str, hit: bool):
+        counts = self.stats["cache"].setdefault(cache, {})
+        result = "hit" if hit else "miss"
+        counts[result] = counts.get(result, 0) + 1
+
+    def finish(self, status: str) -> Dict[str, Any]:
+        """Close the current stage and return the job's stats."""
+        self._end_stage(time.monotonic())
+        self._stage = None
+        self.stats["status"] = status
+        return self.stats
+
+    def _end_stage(self, now: float):
+        if self._stage is not None:
+            stages = self.stats["stages"]
+            stages[self._stage] = stages.get(self._stage, 0.0) + now - self._stage_started
+        self._stage_started = now
+
+    def _write(self, progress: Dict) -> bool:
+        """Store ``progress``; True if cancellation was requested."""
+        # Own short-lived session: the engine's session holds the analysis row
+        db = SessionLocal()
+        try:
+            query = db.query(AnalysisModel).filter(AnalysisModel.id == self.analysis_id)
+            query.update({AnalysisModel.progress: progress}, synchronize_session=False)
+            db.commit()
+            return bool(db.query(AnalysisModel.cancel_requested).filter(AnalysisModel.id == self.analysis_id).scalar())
+        except Exception as e:
+            # Progress is informational; never fail the analysis over it
+            logger.warning(f"Could not record progress of analysis {self.analysis_id}: {str(e)}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
@@ -0,0 +1,85 @@
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from ..core.config import settings
+from ..core.metrics import count_cache
+
+# In-process cache of decoded analysis results.
+#
+# A dashboard load hits several result endpoints for the same analysis. Each
+# entry holds the decoded results summary and the memory-mapped series of one
+# analysis, keyed by its id and ``version`` (which every write to the row
+# increments, unlike the 1 s resolution ``updated_at``), so a changed row is
+# never served stale. Entries are evicted least recently used first once their
+# estimated size exceeds RESULT_CACHE_MAX_BYTES.
+
+class CachedResult(NamedTuple):
+    analysis_id: int
+    name: str
+    status: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    version: Optional[int]
+    results: Dict[str, Any]
+    arrays: Optional[Dict[str, Any]]  # Memory-mapped series, None for results stored inline
+
+def estimate_size(results: Dict[str, Any]) -> int:
+    """Approximate in-memory footprint of a decoded results summary, from its JSON size."""
+    return len(json.dumps(results, default=str))
+
+class ResultCache:
+    """Thread-safe LRU cache of ``CachedResult`` entries with a byte budget."""
+
+    def __init__(self, max_bytes: int = settings.RESULT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, Tuple[Optional[int], CachedResult, int]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, analysis_id: int, version: Optional[int]) -> Optional[CachedResult]:
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is not None and entry[0] != version:
+                self._remove(analysis_id)
+                entry = None
+            count_cache("results", entry is not None)
+            if entry is None:
+                return None
+            self._entries.move_to_end(analysis_id)
+            return entry[1]
+
+    def put(self, result: CachedResult):
+        size = estimate_size(result.results)
+        with self._lock:
+            self._remove(result.analysis_id)
+            if size > self.max_bytes:
+                return  # Larger than the whole budget: serve it uncached
+            self._entries[result.analysis_id] = (result.version, result, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, analysis_id: int):
+        with self._lock:
+            self._remove(analysis_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, analysis_id: int):
+        entry = self._entries.pop(analysis_id, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+result_cache = ResultCache()
@@ -0,0 +1,200 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+from typing import Dict, Any, List, Optional
+from ..core.config import settings
+
+# Binary storage of per-frequency analysis results.
+#
+# Each analysis gets a directory under RESULTS_FOLDER with one uncompressed .npy
+# file per series, so readers can memory-map a series and touch only the rows
+# they need. Only the summary (metrics, indicators, RMS comparison, ...) is kept
+# in the Analysis.results JSON column.
+
+# On-disk dtype per series; everything not listed is stored as-is
+SERIES_DTYPES = {
+    "frequency": np.float64,
+    "path_id": np.int32,
+    "response": np.float32,
+    "response_phase": np.float32,
+    "tf_magnitude": np.float32,
+    "tf_phase": np.float32,
+    "contribution": np.float32,
+    "condition_number": np.float64,
+    "singular_values": np.float32,
+}
+
+def results_path_for(analysis_id: int) -> str:
+    return os.path.join(settings.RESULTS_FOLDER, str(analysis_id))
+
+def save_results(analysis_id: int, results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Persist the per-frequency arrays of a result and return the JSON summary.
+
+    The arrays are written to a temporary directory that is renamed into place,
+    so readers never see a partially written result.
+    """
+    summary = {key: value for key, value in results.items() if key != "arrays"}
+    arrays = results.get("arrays", {})
+
+    os.makedirs(settings.RESULTS_FOLDER, exist_ok=True)
+    target = results_path_for(analysis_id)
+    staging = tempfile.mkdtemp(prefix=f".{analysis_id}-", dir=settings.RESULTS_FOLDER)
+    try:
+        for name, values in arrays.items():
+            values = np.asarray(values)
+            if name in SERIES_DTYPES:
+                values = values.astype(SERIES_DTYPES[name], copy=False)
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(values), allow_pickle=False)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        os.replace(staging, target)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    summary["series"] = {
+        "names": sorted(arrays),
+        "n_frequencies": int(len(arrays["frequency"])) if "frequency" in arrays else 0,
+        "paths": [str(name) for name in arrays.get("path_name", [])],
+    }
+    return summary
+
+def delete_results(results_path: Optional[str]):
+    """Remove the stored arrays of an analysis, if any."""
+    if results_path:
+        shutil.rmtree(results_path, ignore_errors=True)
+
+def open_arrays(results_path: str) -> Dict[str, np.ndarray]:
+    """Memory-map every stored series of an analysis."""
+    arrays = {}
+    for entry in os.listdir(results_path):
+        name, ext = os.path.splitext(entry)
+        if ext == ".npy":
+            arrays[name] = np.load(os.path.join(results_path, entry), mmap_mode="r", allow_pickle=False)
+    return arrays
+
+def frequency_rows(frequency: np.ndarray, f_min: Optional[float] = None, f_max: Optional[float] = None) -> slice:
+    """Rows of the sorted frequency index within [f_min, f_max], by binary search."""
+    start = 0 if f_min is None else int(np.searchsorted(frequency, f_min, side="left"))
+    stop = len(frequency) if f_max is None else int(np.searchsorted(frequency, f_max, side="right"))
+    return slice(start, max(start, stop))
+
+def nearest_row(frequency: np.ndarray, value: float, tolerance: float) -> Optional[int]:
+    """Row of the frequency line closest to ``value``, if within ``tolerance``."""
+    if len(frequency) == 0:
+        return None
+    i = int(np.searchsorted(frequency, value))
+    candidates = [j for j in (i - 1, i) if 0 <= j < len(frequency)]
+    best = min(candidates, key=lambda j: abs(frequency[j] - value))
+    return best if abs(frequency[best] - value) < tolerance else None
+
+def decimate_rows(
+    values: np.ndarray,
+    rows: slice,
+    max_points: Optional[int],
+    columns: Optional[List[int]] = None
+) -> np.ndarray:
+    """
+    Min/max-preserving decimation of a row range for plotting.
+
+    The range is split into equal buckets; each bucket keeps the row holding
+    its highest value and the row holding its lowest value over all (given)
+    columns, i.e. the peaks of the upper and the notches of the lower envelope,
+    together with the first and last row. Only the rows in range (and the
+    given ``columns`` of 2-D series) are read. Returns at most ``max_points``
+    sorted row indices, however many columns there are.
+    """
+    start, stop, _ = rows.indices(len(values))
+    n = stop - start
+    if not max_points or n <= max_points:
+        return np.arange(start, stop)
+
+    window = np.asarray(values[start:stop], dtype=np.float64)
+    if window.ndim == 1:
+        window = window[:, None]
+    elif columns is not None:
+        window = window[:, columns]
+    if window.shape[1] == 0:
+        return np.arange(start, stop)
+
+    ends = np.array([0, n - 1])
+    n_buckets = (max_points - 2) // 2
+    if n_buckets < 1:
+        return start + ends[:max_points]
+
+    # Envelopes across columns; fmax/fmin skip NaN unless a whole row is NaN
+    upper = np.fmax.reduce(window, axis=1)
+    lower = np.fmin.reduce(window, axis=1)
+    size = -(-n // n_buckets)
+    padded = np.full((2, n_buckets * size), np.nan)
+    padded[0, :n] = upper
+    padded[1, :n] = lower
+    upper, lower = padded.reshape(2, n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+
+    # NaN rows (padding, lines without a value) never win unless a whole bucket is NaN
+    picks = np.concatenate([
+        np.argmax(np.where(np.isnan(upper), -np.inf, upper), axis=1) + offsets,
+        np.argmin(np.where(np.isnan(lower), np.inf, lower), axis=1) + offsets,
+        ends,
+    ])
+    return start + np.unique(np.minimum(picks, n - 1))
+
+def path_columns(arrays: Dict[str, np.ndarray], path_ids: Optional[List[int]] = None) -> List[int]:
+    """Columns of the stored per-path series for the requested path ids (all if None)."""
+    ids = arrays["path_id"].tolist()
+    if path_ids is None:
+        return list(range(len(ids)))
+    wanted = set(path_ids)
+    return [column for column, i in enumerate(ids) if i in wanted]
+
+def system_response_records(arrays: Dict[str, np.ndarray], rows=slice(None)) -> List[Dict[str, Any]]:
+    return [
+        {"frequency": f, "response": r, "phase": p}
+        for f, r, p in zip(
+            arrays["frequency"][rows].tolist(), arrays["response"][rows].tolist(), arrays["response_phase"][rows].tolist()
+        )
+    ]
+
+def transfer_function_records(
+    arrays: Dict[str, np.ndarray],
+    columns: List[int],
+    rows: slice = slice(None),
+    max_points: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    path_ids = arrays["path_id"].tolist()
+    path_names = arrays["path_name"].tolist()
+    records = []
+    for column in columns:
+        selected = decimate_rows(arrays["tf_magnitude"][:, column], rows, max_points) if max_points else rows
+        i, name = path_ids[column], path_names[column]
+        records.extend(
+            {"path_id": i, "path_name": name, "frequency": f, "magnitude": m, "phase": p}
+            for f, m, p in zip(
+                arrays["frequency"][selected].tolist(),
+                arrays["tf_magnitude"][selected, column].tolist(),
+                arrays["tf_phase"][selected, column].tolist()
+            )
+        )
+    return records
+
+def contribution_records(arrays: Dict[str, np.ndarray], columns: List[int], rows=slice(None)) -> List[Dict[str, Any]]:
+    path_names = arrays["path_name"].tolist()
+    names = [path_names[column] for column in columns]
+    shares = arrays["contribution"][rows][..., columns]
+    return [
+        {"frequency": f, "contributions": dict(zip(names, row))}
+        for f, row in zip(np.atleast_1d(arrays["frequency"][rows]).tolist(), np.atleast_2d(shares).tolist())
+    ]
+
+def conditioning_records(arrays: Dict[str, np.ndarray], rows=slice(None)) -> List[Dict[str, Any]]:
+    """Conditioning per line; lines without an estimate (NaN, lstsq and normal solvers) are left out."""
+    return [
+        {"frequency": f, "condition_number": c, "singular_values": sv}
+        for f, c, sv in zip(
+            arrays["frequency"][rows].tolist(), arrays["condition_number"][rows].tolist(), arrays["singular_values"][rows].tolist()
+        )
+        if not np.isnan(c)
+    ]
@@ -0,0 +1,401 @@
+import numpy as np
+import scipy.fft
+import scipy.signal
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from numpy.lib.stride_tricks import sliding_window_view
+from ..core.config import settings
+from .file_processor import detect_channel_type
+from .measurement import Measurement
+from . import tpa_solver
+
+# Welch estimation of auto/cross spectra from multi-channel time histories.
+#
+# Recordings are consumed block by block: every block is cut into overlapping
+# windowed segments, all segments of all channels are transformed in one
+# batched real FFT, and the (n_freq, n_channels, n_channels) cross-spectral
+# matrix is accumulated. Only the samples of an unfinished segment are carried
+# over between blocks, so memory does not grow with the recording length.
+#
+# Recordings that contain force channels are treated as FRF measurements
+# (impact or shaker tests): only the input auto/cross spectra, the input/output
+# cross spectra and the output auto spectra are accumulated, from which the
+# H1, H2 and Hv estimators are formed.
+
+FRF_ESTIMATORS = ("H1", "H2", "Hv")
+
+@dataclass
+class CrossSpectrum:
+    """
+    Averaged one-sided cross-power spectral matrix of a set of channels.
+
+    ``csd[k, i, j]`` is the cross power between channels i and j at line k,
+    E[conj(X_i) X_j], scaled as a power spectrum (units squared per line, as
+    ``scipy.signal.csd(..., scaling="spectrum")``).
+    """
+    frequencies: np.ndarray
+    csd: np.ndarray
+    channel_names: List[str]
+    n_averages: int
+    file_id: Optional[int] = None
+
+    def index(self, name: str) -> int:
+        return self.channel_names.index(name)
+
+    def auto_spectra(self) -> np.ndarray:
+        """(n_freq, n_channels) auto power spectra."""
+        return np.real(np.diagonal(self.csd, axis1=1, axis2=2))
+
+    def coherence(self, reference: str) -> np.ndarray:
+        """(n_freq, n_channels) ordinary coherence of every channel with ``reference``."""
+        r = self.index(reference)
+        auto = self.auto_spectra()
+        denominator = auto * auto[:, r:r + 1]
+        return np.divide(
+            np.abs(self.csd[:, r, :]) ** 2, denominator,
+            out=np.zeros_like(denominator), where=denominator > 0
+        )
+
+    def referenced_spectra(self, reference: str) -> np.ndarray:
+        """
+        (n_freq, n_channels) RMS amplitude spectra with phase relative to ``reference``.
+
+        Computed as S_rj / sqrt(S_rr), the usual way to obtain phase-consistent
+        operational spectra from autopower measurements with a single reference.
+        """
+        r = self.index(reference)
+        reference_amplitude = np.sqrt(self.auto_spectra()[:, r:r + 1])
+        return np.divide(
+            self.csd[:, r, :], reference_amplitude,
+            out=np.zeros(self.csd.shape[:2], dtype=np.complex128), where=reference_amplitude > 0
+        )
+
+def combine_cross_spectra(spectra: List[CrossSpectrum]) -> CrossSpectrum:
+    """
+    Pool the blocks of several recordings of the same channels (e.g. runs or RPM steps).
+
+    The spectra are averaged weighted by their number of segments.
+    """
+    first = spectra[0]
+    total = first.csd * first.n_averages
+    n_averages = first.n_averages
+    for spectrum in spectra[1:]:
+        if spectrum.channel_names != first.channel_names or not np.array_equal(spectrum.frequencies, first.frequencies):
+            raise ValueError("Operational recordings must share channels and frequency lines to be combined")
+        total = total + spectrum.csd * spectrum.n_averages
+        n_averages += spectrum.n_averages
+    return CrossSpectrum(first.frequencies, total / n_averages, first.channel_names, n_averages)
+
+class WelchEstimator:
+    """Streaming Welch estimator of the cross-spectral matrix of multi-channel data."""
+
+    def __init__(
+        self,
+        channel_names: List[str],
+        sample_rate: float,
+        segment_length: int = settings.WELCH_SEGMENT_LENGTH,
+        overlap: float = settings.WELCH_OVERLAP,
+        window: str = "hann",
+        workers: int = settings.FFT_WORKERS
+    ):
+        if not 0 <= overlap < 1:
+            raise ValueError(f"Segment overlap must be in [0, 1), got {overlap}")
+        self.channel_names = list(channel_names)
+        self.sample_rate = float(sample_rate)
+        self.segment_length = int(segment_length)
+        self.step = max(1, int(round(self.segment_length * (1 - overlap))))
+        self.workers = workers
+        self.window = scipy.signal.get_window(window, self.segment_length)
+
+        n_channels = len(self.channel_names)
+        n_lines = self.segment_length // 2 + 1
+        self._sum = np.zeros((n_lines, n_channels, n_channels), dtype=np.complex128)
+        self._pending = np.empty((n_channels, 0))
+        self.n_averages = 0
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        return scipy.fft.rfftfreq(self.segment_length, d=1.0 / self.sample_rate)
+
+    def _segments(self, values: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Windowed, mean-removed segments completed by a block, (n_channels, n_segments, segment_length).
+
+        Samples of the unfinished last segment are kept for the next block.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if self._pending.shape[1]:
+            values = np.concatenate([self._pending, values], axis=1)
+
+        n_segments = 0 if values.shape[1] < self.segment_length else (values.shape[1] - self.segment_length) // self.step + 1
+        self._pending = values[:, n_segments * self.step:].copy()
+        if not n_segments:
+            return None
+        self.n_averages += n_segments
+        segments = sliding_window_view(values, self.segment_length, axis=1)[:, ::self.step][:, :n_segments]
+        return (segments - segments.mean(axis=2, keepdims=True)) * self.window
+
+    def _spectra(self, segments: np.ndarray, workers: Optional[int] = None) -> np.ndarray:
+        """Batched FFT of segments, returned as (n_lines, n_channels, n_segments)."""
+        spectra = scipy.fft.rfft(segments, axis=2, workers=workers or self.workers)
+        return np.ascontiguousarray(spectra.transpose(2, 0, 1))
+
+    def _scaled(self, total: np.ndarray) -> np.ndarray:
+        """Average accumulated spectral products as a one-sided power spectrum."""
+        if self.n_averages == 0:
+            raise ValueError(
+                f"Recording is shorter than one {self.segment_length}-sample segment"
+            )
+        scaled = total * (1.0 / (self.n_averages * self.window.sum() ** 2))
+        # One-sided spectrum: fold the negative frequencies onto the positive lines
+        last = -1 if self.segment_length % 2 == 0 else None
+        scaled[1:last] *= 2
+        return scaled
+
+    def update(self, values: np.ndarray):
+        """Add a block of samples, shaped (n_channels, n_samples), continuing the previous one."""
+        segments = self._segments(values)
+        if segments is not None:
+            spectra = self._spectra(segments)
+            # (n_lines, n_channels, n_segments) @ its conjugate transpose sums conj(X_i) X_j over segments
+            self._sum += np.conj(spectra) @ spectra.transpose(0, 2, 1)
+
+    def close(self):
+        """Release resources held between blocks."""
+
+    def result(self, file_id: Optional[int] = None) -> CrossSpectrum:
+        return CrossSpectrum(self.frequencies, self._scaled(self._sum), self.channel_names, self.n_averages, file_id=file_id)
+
+@dataclass
+class FRFEstimate:
+    """
+    Averaged spectra of an FRF measurement and the FRF estimators derived from them.
+
+    ``gxx`` (n_freq, n_inputs, n_inputs) holds the input cross spectra, ``gxy``
+    (n_freq, n_inputs, n_outputs) the input/output cross spectra E[conj(X) Y] and
+    ``gyy`` (n_freq, n_outputs) the output auto spectra.
+    """
+    frequencies: np.ndarray
+    gxx: np.ndarray
+    gxy: np.ndarray
+    gyy: np.ndarray
+    excitation_names: List[str]
+    response_names: List[str]
+    n_averages: int
+    file_id: Optional[int] = None
+
+    def _h1_transposed(self) -> np.ndarray:
+        # Gxx H^T = Gxy; the pseudo-inverse copes with lines without excitation (e.g. DC)
+        return np.linalg.pinv(self.gxx) @ self.gxy
+
+    def frf(self, estimator: str = "H1") -> np.ndarray:
+        """
+        (n_freq, n_outputs, n_inputs) FRF matrix.
+
+        H1 minimises noise on the outputs, H2 noise on the input (single input
+        only) and Hv the total least-squares error on both.
+        """
+        if estimator == "H1":
+            return self._h1_transposed().transpose(0, 2, 1)
+
+        if estimator == "H2":
+            if len(self.excitation_names) != 1:
+                raise ValueError("The H2 estimator needs exactly one excitation channel")
+            gyx = np.conj(self.gxy[:, 0, :])
+            h = np.divide(self.gyy, gyx, out=np.zeros_like(gyx), where=np.abs(gyx) > 0)
+            return h[:, :, None]
+
+        if estimator == "Hv":
+            # Per output, the eigenvector of the smallest eigenvalue of [[Gxx, Gxy], [Gyx, Gyy]]
+            # is proportional to [H; -1]
+            n_freq, n_inputs, n_outputs = self.gxy.shape
+            matrix = np.empty((n_freq, n_outputs, n_inputs + 1, n_inputs + 1), dtype=np.complex128)
+            matrix[:, :, :n_inputs, :n_inputs] = self.gxx[:, None]
+            matrix[:, :, :n_inputs, n_inputs] = self.gxy.transpose(0, 2, 1)
+            matrix[:, :, n_inputs, :n_inputs] = np.conj(self.gxy.transpose(0, 2, 1))
+            matrix[:, :, n_inputs, n_inputs] = self.gyy
+            _, vectors = np.linalg.eigh(matrix)
+            smallest = vectors[..., 0]
+            last = smallest[..., n_inputs:]
+            return np.divide(
+                -smallest[..., :n_inputs], last,
+                out=np.zeros((n_freq, n_outputs, n_inputs), dtype=np.complex128), where=np.abs(last) > 0
+            )
+
+        raise ValueError(f"Unknown FRF estimator '{estimator}', expected one of: {', '.join(FRF_ESTIMATORS)}")
+
+    def coherence(self) -> np.ndarray:
+        """(n_freq, n_outputs) multiple coherence of every output with the inputs."""
+        return tpa_solver.multiple_coherence(self.gxy, self.gyy, self._h1_transposed())
+
+class FRFEstimator(WelchEstimator):
+    """
+    Streaming estimator of the spectra needed for H1/H2/Hv FRFs.
+
+    Blocks are shaped (n_inputs + n_outputs, n_samples) with the excitation
+    channels first. Outputs are transformed and accumulated in groups of
+    ``group_size`` channels on a thread pool (the FFTs and matrix products
+    release the GIL), so large response sets use every core. The pool is
+    created on the first block and kept until ``close``.
+    """
+
+    def __init__(
+        self,
+        excitation_names: List[str],
+        response_names: List[str],
+        sample_rate: float,
+        group_size: int = settings.FRF_CHANNEL_GROUP,
+        **options
+    ):
+        super().__init__(list(excitation_names) + list(response_names), sample_rate, **options)
+        self.excitation_names = list(excitation_names)
+        self.response_names = list(response_names)
+        n_lines = self.segment_length // 2 + 1
+        n_inputs, n_outputs = len(self.excitation_names), len(self.response_names)
+
+        # The full channel cross-spectral matrix is not needed
+        self._sum = None
+        self._gxx = np.zeros((n_lines, n_inputs, n_inputs), dtype=np.complex128)
+        self._gxy = np.zeros((n_lines, n_inputs, n_outputs), dtype=np.complex128)
+        self._gyy = np.zeros((n_lines, n_outputs))
+        self._groups = [
+            slice(start, min(start + max(1, group_size), n_outputs))
+            for start in range(0, n_outputs, max(1, group_size))
+        ]
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _accumulate_group(self, inputs: np.ndarray, segments: np.ndarray, group: slice):
+        outputs = self._spectra(segments[group], workers=1)
+        self._gxy[:, :, group] += np.conj(inputs) @ outputs.transpose(0, 2, 1)
+        self._gyy[:, group] += np.sum(np.abs(outputs) ** 2, axis=2)
+
+    def update(self, values: np.ndarray):
+        segments = self._segments(values)
+        if segments is None:
+            return
+        n_inputs = len(self.excitation_names)
+        inputs = self._spectra(segments[:n_inputs])
+        self._gxx += np.conj(inputs) @ inputs.transpose(0, 2, 1)
+
+        outputs = segments[n_inputs:]
+        if len(self._groups) > 1 and self.workers > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=min(self.workers, len(self._groups)))
+            list(self._pool.map(lambda group: self._accumulate_group(inputs, outputs, group), self._groups))
+        else:
+            for group in self._groups:
+                self._accumulate_group(inputs, outputs, group)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def result(self, file_id: Optional[int] = None) -> FRFEstimate:
+        return FRFEstimate(
+            self.frequencies,
+            self._scaled(self._gxx),
+            self._scaled(self._gxy),
+            self._scaled(self._gyy),
+            self.excitation_names,
+            self.response_names,
+            self.n_averages,
+            file_id=file_id
+        )
+
+def is_excitation(channel_name: str) -> bool:
+    """Whether a channel is an excitation (force) signal of an FRF measurement."""
+    return detect_channel_type(channel_name) == "force"
+
+def _estimator(channel_names: List[str], sample_rate: float, **options) -> WelchEstimator:
+    """FRF estimator if the recording has force channels, plain cross-spectral estimator otherwise."""
+    excitations = [name for name in channel_names if is_excitation(name)]
+    if excitations:
+        responses = [name for name in channel_names if name not in excitations]
+        if not responses:
+            raise ValueError("FRF measurement has force channels but no response channels")
+        return FRFEstimator(excitations, responses, sample_rate, **options)
+    return WelchEstimator(channel_names, sample_rate, **options)
+
+def _estimate(
+    blocks: Iterator[Tuple[List[str], np.ndarray]],
+    sample_rate: float,
+    file_id: Optional[int],
+    **options
+) -> Union[CrossSpectrum, FRFEstimate]:
+    estimator, order = None, None
+    try:
+        for channel_names, values in blocks:
+            if estimator is None:
+                estimator = _estimator(channel_names, sample_rate, **options)
+                order = [channel_names.index(name) for name in estimator.channel_names]
+            estimator.update(values[order])
+    finally:
+        if estimator is not None:
+            estimator.close()
+    if estimator is None:
+        raise ValueError("Time-domain data file is empty")
+    return estimator.result(file_id=file_id)
+
+def measurement_spectra(measurement: Measurement, **options) -> Union[CrossSpectrum, FRFEstimate]:
+    """Welch spectra (or FRF spectra) of an in-memory time-domain measurement."""
+    if measurement.sample_rate is None:
+        raise ValueError("Cross spectra need a time-domain measurement with at least two samples")
+    block_rows = max(settings.WELCH_BLOCK_ROWS, options.get("segment_length", settings.WELCH_SEGMENT_LENGTH))
+    blocks = (
+        (measurement.channel_names, np.real(measurement.values[:, start:start + block_rows]))
+        for start in range(0, measurement.values.shape[1], block_rows)
+    )
+    return _estimate(blocks, measurement.sample_rate, measurement.file_id, **options)
+
+def block_spectra(
+    blocks: Iterator[Measurement],
+    file_id: Optional[int] = None,
+    **options
+) -> Union[CrossSpectrum, FRFEstimate]:
+    """
+    Welch spectra (or FRF spectra) of a time-domain recording read as consecutive blocks.
+
+    The sample rate is taken from the ``time`` column of the first block.
+    """
+    first = next(blocks, None)
+    if first is None:
+        raise ValueError("Time-domain data file is empty")
+    if first.sample_rate is None:
+        raise ValueError("Time-domain data needs a 'time' column with at least two samples")
+
+    def values():
+        yield first.channel_names, np.real(first.values)
+        for block in blocks:
+            yield block.channel_names, np.real(block.values)
+
+    return _estimate(values(), first.sample_rate, file_id, **options)
+
+def is_time_history(handles: Dict[str, object]) -> bool:
+    """Whether a set of file datasets is a recording: a 1-D ``time`` vector and channels of the same length."""
+    time = handles.get("time")
+    return time is not None and len(time.shape) == 1 and any(
+        name != "time" and handle.shape == time.shape for name, handle in handles.items()
+    )
+
+def dataset_spectra(
+    handles: Dict[str, object],
+    file_id: Optional[int] = None,
+    block_rows: int = settings.WELCH_BLOCK_ROWS,
+    **options
+) -> Union[CrossSpectrum, FRFEstimate]:
+    """Welch spectra (or FRF spectra) of a recording stored as lazy datasets (e.g. HDF5), read in blocks."""
+    time = handles["time"]
+    n_samples = time.shape[0]
+    if n_samples < 2:
+        raise ValueError("Time-domain data needs a 'time' vector with at least two samples")
+    duration = float(np.real(time.read(n_samples - 1)) - np.real(time.read(0)))
+    sample_rate = (n_samples - 1) / duration
+
+    names = [name for name, handle in handles.items() if name != "time" and handle.shape == time.shape]
+    blocks = (
+        (names, np.stack([np.real(handles[name].read(slice(start, start + block_rows))) for name in names]))
+        for start in range(0, n_samples, block_rows)
+    )
+    return _estimate(blocks, sample_rate, file_id, **options)
@@ -1,60 +1,88 @@
 import numpy as np
 import pandas as pd
 import os
-import json
-from typing import Dict, List, Any, Optional
+import hashlib
+from typing import Dict, Iterator, List, Any, Optional
 from sqlalchemy.orm import Session
 from ..db.models.analysis import Analysis as AnalysisModel, AnalysisStatus
 from ..db.models.file import File as FileModel
 from ..core.config import settings
 import scipy.io as sio
-import h5py
-import time
 import logging
+from . import tpa_solver, result_store, datasets, spectral, column_cache, frf_cache
+from .progress import AnalysisCancelled, ProgressReporter
+from .measurement import AXIS_COLUMNS, Measurement, read_csv_blocks, read_csv_measurement, read_excel_measurement
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def run_analysis(analysis_id: int, file_ids: List[int], parameters: Dict[str, Any], db: Session):
-    """Run TPA analysis in background."""
+def run_analysis(
+    analysis_id: int,
+    file_ids: List[int],
+    parameters: Dict[str, Any],
+    db: Session
+) -> Optional[Dict[str, Any]]:
+    """Run TPA analysis in background; returns the job's stats for the metrics."""
+    reporter = ProgressReporter(analysis_id)
     try:
         # Update analysis status to running
         db_analysis = db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).first()
         if not db_analysis:
             logger.error(f"Analysis {analysis_id} not found")
-            return
+            return None
         
         db_analysis.status = AnalysisStatus.RUNNING
         db.commit()
         
         logger.info(f"Starting analysis {analysis_id}")
+        reporter.update("loading")
         
         # Get files
         files = db.query(FileModel).filter(FileModel.id.in_(file_ids)).all()
         if not files:
             raise ValueError("No files found for analysis")
         
-        # Load data from files
-        try:
-            data = load_data_from_files(files)
-        except Exception as e:
-            logger.error(f"Error loading data from files: {str(e)}")
-            raise ValueError(f"Error loading data from files: {str(e)}")
-        
-        # Perform TPA analysis
-        try:
-            results = perform_tpa_analysis(data, parameters)
-        except Exception as e:
-            logger.error(f"Error performing TPA analysis: {str(e)}")
-            raise ValueError(f"Error performing TPA analysis: {str(e)}")
+        # Datasets stay open (and on disk) until the analysis is done
+        with datasets.DatasetStore() as store:
+            # Load data from files
+            try:
+                data = load_data_from_files(files, store, columns=_requested_columns(parameters), progress=reporter)
+            except AnalysisCancelled:
+                raise
+            except Exception as e:
+                logger.error(f"Error loading data from files: {str(e)}")
+                raise ValueError(f"Error loading data from files: {str(e)}")
+            
+            # Perform TPA analysis
+            try:
+                results = perform_tpa_analysis(data, parameters, progress=reporter)
+            except AnalysisCancelled:
+                raise
+            except Exception as e:
+                logger.error(f"Error performing TPA analysis: {str(e)}")
+                raise ValueError(f"Error performing TPA analysis: {str(e)}")
         
-        # Update analysis with results
-        db_analysis.results = results
+        # Persist the per-frequency arrays; only the summary goes into the row
+        reporter.update("persistence")
+        db_analysis.results = result_store.save_results(analysis_id, results)
+        db_analysis.results_path = result_store.results_path_for(analysis_id)
         db_analysis.status = AnalysisStatus.COMPLETED
+        db_analysis.progress = {"stage": "done", "percent": 100.0, "eta_seconds": 0.0}
         db.commit()
         
         logger.info(f"Analysis {analysis_id} completed successfully")
+        return reporter.finish(AnalysisStatus.COMPLETED.value)
+        
+    except AnalysisCancelled:
+        logger.info(f"Analysis {analysis_id} cancelled")
+        db.rollback()
+        db.query(AnalysisModel).filter(AnalysisModel.id == analysis_id).update(
+            {AnalysisModel.status: AnalysisStatus.CANCELLED, AnalysisModel.error_message: "Analysis cancelled"},
+            synchronize_session=False
+        )
+        db.commit()
+        return reporter.finish(AnalysisStatus.CANCELLED.value)
         
     except Exception as e:
         logger.error(f"Error in analysis {analysis_id}: {str(e)}")
@@ -64,26 +92,98 @@ def run_analysis(analysis_id: int, file_ids: List[int], parameters: Dict[str, An
             db_analysis.status = AnalysisStatus.FAILED
             db_analysis.error_message = str(e)
             db.commit()
+        return reporter.finish(AnalysisStatus.FAILED.value)
+
+def _requested_columns(parameters: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    Table columns an analysis needs, or None for all of them.
+
+    Columns can only be narrowed down when the indicator (or reference)
+    channels are named; otherwise every non-target channel is an indicator.
+    """
+    named = list(parameters.get("indicators") or parameters.get("references") or [])
+    if not named:
+        return None
+    named += list(parameters.get("targets") or [])
+    if parameters.get("reference_channel"):
+        named.append(parameters["reference_channel"])
+    return named
+
+def _table_columns(file_path: str, columns: Optional[List[str]]) -> Optional[List[str]]:
+    """Cached columns to read: the requested channels plus axis and force channels."""
+    if columns is None:
+        return None
+    wanted = set(columns)
+    return [
+        name for name in column_cache.column_names(file_path)
+        if name in wanted or name in AXIS_COLUMNS or spectral.is_excitation(name)
+    ]
+
+def load_data_from_files(
+    files: List[FileModel],
+    store: Optional[datasets.DatasetStore] = None,
+    columns: Optional[List[str]] = None,
+    progress: Optional[ProgressReporter] = None
+) -> Dict[str, Any]:
+    """
+    Load data from files for analysis.
+
+    Matrices are returned as lazy dataset handles rather than arrays: HDF5 and
+    MATLAB v7.3 variables stay on disk (open in ``store``) and are read by
+    frequency-line slabs when the engine needs them. Tables are returned as
+    ``Measurement`` objects holding one contiguous array per channel; time-domain
+    recordings are reduced to Welch cross spectra while they are read, so they
+    are never held in memory as a whole; recordings with force channels become
+    FRF measurements. CSV and Excel tables are read from their columnar cache
+    (built on upload, or here for older files), restricted to ``columns``.
+    Progress is reported per file and per block of time-domain data, which
+    are also the points where a cancelled analysis stops.
+    """
+    if store is None:
+        store = datasets.DatasetStore()
 
-def load_data_from_files(files: List[FileModel]) -> Dict[str, Any]:
-    """Load data from files for analysis."""
     data = {
         "frf_matrices": [],
         "operational_data": [],
+        "cross_spectra": [],
+        "estimated_frfs": [],
         "reference_points": [],
         "response_points": []
     }
     
-    for file in files:
+    for i, file in enumerate(files):
+        done = i / len(files)
+        _checkpoint(progress, "loading", done)
         file_ext = os.path.splitext(file.filename)[1].lower()
         
-        if file_ext == '.csv':
+        cached = file_ext in column_cache.CACHED_EXTENSIONS and column_cache.has_cache(file.filepath)
+        if file_ext in column_cache.CACHED_EXTENSIONS and progress is not None:
+            progress.count_cache("column_cache", cached)
+        _count_bytes_read(progress, file_ext, column_cache.cache_path_for(file.filepath) if cached else file.filepath)
+        
+        if file_ext in column_cache.CACHED_EXTENSIONS and column_cache.ensure_cache(file.filepath):
+            selected = _table_columns(file.filepath, columns)
+            if "time" in column_cache.column_names(file.filepath):
+                blocks = column_cache.read_blocks(file.filepath, selected, file_id=file.id)
+                _add_spectra(data, spectral.block_spectra(_checkpoints(blocks, progress, done), file_id=file.id))
+            else:
+                data["operational_data"].append(column_cache.read_measurement(file.filepath, selected, file_id=file.id))
+        
+        elif file_ext == '.csv':
             # Assume CSV contains operational data
-            df = pd.read_csv(file.filepath)
-            data["operational_data"].append({
-                "file_id": file.id,
-                "data": df.to_dict(orient="list")
-            })
+            if "time" in pd.read_csv(file.filepath, nrows=0).columns:
+                blocks = read_csv_blocks(file.filepath, settings.WELCH_BLOCK_ROWS, file_id=file.id)
+                _add_spectra(data, spectral.block_spectra(_checkpoints(blocks, progress, done), file_id=file.id))
+            else:
+                data["operational_data"].append(read_csv_measurement(file.filepath, file_id=file.id))
+        
+        elif file_ext == '.xlsx':
+            measurement = read_excel_measurement(file.filepath, file_id=file.id)
+            if measurement.axis_name == "time":
+                _checkpoint(progress, "spectral_estimation", done)
+                _add_spectra(data, spectral.measurement_spectra(measurement))
+            else:
+                data["operational_data"].append(measurement)
         
         elif file_ext == '.mat':
             # Assume MAT contains FRF matrices
@@ -96,186 +196,715 @@ def load_data_from_files(files: List[FileModel]) -> Dict[str, Any]:
                         if isinstance(mat_data[key], np.ndarray):
                             data["frf_matrices"].append({
                                 "file_id": file.id,
+                                "content_hash": file.content_hash,
                                 "name": key,
-                                "matrix": mat_data[key].tolist() if mat_data[key].size < 10000 else "Matrix too large"
+                                "matrix": datasets.ArrayDataset(key, mat_data[key])
                             })
-            except:
-                # Try loading with h5py for MATLAB v7.3 files
+            except Exception:
+                # MATLAB v7.3 files are HDF5 containers
                 try:
-                    with h5py.File(file.filepath, 'r') as f:
-                        for key in f:
-                            if isinstance(f[key], h5py.Dataset):
-                                data["frf_matrices"].append({
-                                    "file_id": file.id,
-                                    "name": key,
-                                    "matrix": f[key][()].tolist() if f[key].size < 10000 else "Matrix too large"
-                                })
+                    for key, dataset in store.datasets(file.filepath, matlab=True).items():
+                        data["frf_matrices"].append({
+                            "file_id": file.id,
+                            "content_hash": file.content_hash,
+                            "name": key,
+                            "matrix": dataset
+                        })
                 except Exception as e:
                     logger.error(f"Error loading MATLAB file: {str(e)}")
         
         elif file_ext == '.h5':
             try:
-                with h5py.File(file.filepath, 'r') as f:
-                    for key in f:
-                        if isinstance(f[key], h5py.Dataset):
-                            data["frf_matrices"].append({
-                                "file_id": file.id,
-                                "name": key,
-                                "matrix": f[key][()].tolist() if f[key].size < 10000 else "Matrix too large"
-                            })
+                handles = store.datasets(file.filepath)
+                if spectral.is_time_history(handles):
+                    _checkpoint(progress, "spectral_estimation", done)
+                    _add_spectra(data, spectral.dataset_spectra(handles, file_id=file.id))
+                    continue
+                for key, dataset in handles.items():
+                    data["frf_matrices"].append({
+                        "file_id": file.id,
+                        "content_hash": file.content_hash,
+                        "name": key,
+                        "matrix": dataset
+                    })
             except Exception as e:
                 logger.error(f"Error loading HDF5 file: {str(e)}")
     
     return data
 
-def perform_tpa_analysis(data: Dict[str, Any], parameters: Dict[str, Any]) -> Dict[str, Any]:
+def _count_bytes_read(progress: Optional[ProgressReporter], file_ext: str, path: str):
+    if progress is not None and os.path.exists(path):
+        progress.add_bytes_read(file_ext.lstrip("."), os.path.getsize(path))
+
+def _checkpoint(progress: Optional[ProgressReporter], stage: str, fraction: float = 0.0):
+    if progress is not None:
+        progress.update(stage, fraction)
+
+def _checkpoints(blocks: Iterator[Measurement], progress: Optional[ProgressReporter], fraction: float) -> Iterator[Measurement]:
+    """Pass blocks of a recording through, reporting spectral estimation progress before each."""
+    for block in blocks:
+        _checkpoint(progress, "spectral_estimation", fraction)
+        yield block
+
+def _add_spectra(data: Dict[str, Any], spectra):
+    """File spectra of a time-domain recording under operational or FRF data."""
+    if isinstance(spectra, spectral.FRFEstimate):
+        data["estimated_frfs"].append(spectra)
+    else:
+        data["cross_spectra"].append(spectra)
+
+# Variable names recognised in FRF/operational files, by role (matched case-insensitively)
+VARIABLE_ROLES = {
+    "frequency": ("frequency", "frequencies", "freq", "f"),
+    "indicator_frf": ("frf", "h", "frf_indicator", "h_indicator", "h_ind"),
+    "target_frf": ("frf_target", "target_frf", "h_target", "h_t", "ntf"),
+    "indicator_response": ("u", "indicator_response", "response_indicator", "operational_response"),
+    "target_response": ("y", "target_response", "response_target"),
+}
+
+# Supported analysis methods: matrix-inversion (classical / in-situ) TPA and operational TPA
+TPA_METHODS = ("classical", "otpa")
+
+# Reference amplitude for the overall target level (20 µPa, sound pressure)
+REFERENCE_PRESSURE = 2e-5
+
+def _variable_role(name: str) -> Optional[str]:
+    """Map a file variable name to its TPA role, if any."""
+    name = name.lower()
+    for role, names in VARIABLE_ROLES.items():
+        if name in names:
+            return role
+    return None
+
+def _interpolate(frequencies: np.ndarray, source_freq: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Linear interpolation of a (possibly complex) spectrum onto ``frequencies``."""
+    if np.iscomplexobj(values):
+        return np.interp(frequencies, source_freq, values.real) + 1j * np.interp(frequencies, source_freq, values.imag)
+    return np.interp(frequencies, source_freq, values)
+
+def _operational_channels(measurement: Measurement, frequencies: np.ndarray) -> Dict[str, np.ndarray]:
     """
-    Perform Transfer Path Analysis.
-    
-    This implementation includes both simplified mock results for demonstration
-    and the actual TPA algorithm implementation.
+    Interpolate the spectra of a frequency-domain measurement onto the FRF grid.
+
+    Complex channels keep their phase; real-valued channels are taken as
+    zero-phase spectra.
+    """
+    if measurement.axis_name != "frequency":
+        raise ValueError("Operational data must contain a 'frequency' column")
+
+    order = np.argsort(measurement.axis, kind="stable")
+    source_freq = measurement.axis[order]
+
+    return {
+        name: _interpolate(frequencies, source_freq, measurement.channel(name)[order]).astype(np.complex128)
+        for name in measurement.channel_names
+    }
+
+def _spectral_channels(
+    spectrum: spectral.CrossSpectrum,
+    frequencies: np.ndarray,
+    reference: Optional[str]
+) -> tuple:
+    """
+    Operational spectra and coherences of a time-domain recording on the FRF grid.
+
+    Spectra are phase-referenced to ``reference`` (the first channel if it is not
+    part of this recording); coherence with the reference is returned for the
+    other channels.
+    """
+    if reference not in spectrum.channel_names:
+        reference = spectrum.channel_names[0]
+    spectra = spectrum.referenced_spectra(reference)
+    coherence = spectrum.coherence(reference)
+
+    channels, coherences = {}, {}
+    for i, name in enumerate(spectrum.channel_names):
+        channels[name] = _interpolate(frequencies, spectrum.frequencies, spectra[:, i])
+        if name != reference:
+            coherences[name] = _interpolate(frequencies, spectrum.frequencies, coherence[:, i])
+    return channels, coherences
+
+def _select_channels(channels: Dict[str, np.ndarray], names: List[str], role: str) -> np.ndarray:
+    """Stack the named operational channels into an (n_freq, n_channels) matrix."""
+    missing = [name for name in names if name not in channels]
+    if missing:
+        raise ValueError(f"Operational data is missing {role} channels: {', '.join(missing)}")
+    return np.stack([channels[name] for name in names], axis=1)
+
+def _frf_dimensions(shape: tuple) -> tuple:
+    """(n_responses, n_paths) of a frequency-first FRF shape, as ``as_frf_tensor`` sees it."""
+    if len(shape) == 1:
+        return 1, 1
+    if len(shape) == 2:
+        return 1, shape[1]
+    if len(shape) == 3:
+        return shape[1], shape[2]
+    raise ValueError(f"FRF tensor must have 1 to 3 dimensions, got shape {shape}")
+
+def _channel_count(shape: tuple) -> int:
+    """Number of channels of a frequency-first response shape."""
+    if len(shape) == 1:
+        return 1
+    if len(shape) == 2:
+        return shape[1]
+    raise ValueError(f"Response matrix must have 1 or 2 dimensions, got shape {shape}")
+
+def _estimated_frf_views(
+    estimate: spectral.FRFEstimate,
+    indicator_names: List[str],
+    target_names: List[str],
+    estimator: str
+) -> tuple:
+    """
+    Indicator and target FRF views from an FRF measurement.
+
+    Responses named as targets form the target FRF; the indicators are the
+    responses named as indicators, or all other responses.
+    """
+    responses = estimate.response_names
+    targets = [name for name in target_names if name in responses]
+    if indicator_names:
+        missing = [name for name in indicator_names if name not in responses]
+        if missing:
+            raise ValueError(f"FRF measurement has no response channels: {', '.join(missing)}")
+        indicators = list(indicator_names)
+    else:
+        indicators = [name for name in responses if name not in targets]
+    if not indicators:
+        raise ValueError("FRF measurement has no indicator response channels")
+
+    frf = estimate.frf(estimator)
+    indicator_frf = datasets.FrequencyAxisView(
+        datasets.ArrayDataset("indicator FRF", frf[:, [responses.index(name) for name in indicators]]), 0
+    )
+    target_frf = None
+    if targets:
+        target_frf = datasets.FrequencyAxisView(
+            datasets.ArrayDataset("target FRF", frf[:, [responses.index(name) for name in targets]]), 0
+        )
+    return indicator_frf, target_frf, indicators, targets if targets else target_names
+
+def assemble_tpa_problem(data: Dict[str, Any], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Describe the FRF/response data for the matrix-inversion solver.
+
+    FRF tensors are taken from the FRF files by variable name (see ``VARIABLE_ROLES``)
+    and exposed as frequency-first views that read line slabs on demand.
+    Indicator and target responses come either from the same files or from
+    operational data tables, selected by the ``indicators`` and ``targets``
+    parameters. If no target FRF is supplied, the indicators are used as targets,
+    which yields the on-board validation of an in-situ TPA. Without an FRF matrix,
+    FRFs are estimated (``frf_estimator``: H1, H2 or Hv) from an FRF measurement
+    whose force channels are the paths. Spectra of time-domain
+    recordings are phase-referenced to ``reference_channel`` (default: the first
+    target).
+    """
+    handles, sources = {}, {}
+    for entry in data.get("frf_matrices", []):
+        role = _variable_role(entry["name"])
+        if role is None or role in handles:
+            continue
+        matrix = entry["matrix"]
+        if not hasattr(matrix, "read"):
+            matrix = datasets.ArrayDataset(entry["name"], matrix)
+        handles[role] = matrix
+        sources[role] = entry
+
+    # FRFs estimated from raw test data are used when no FRF matrix is supplied
+    estimated_frfs = data.get("estimated_frfs", [])
+    estimate = estimated_frfs[0] if "indicator_frf" not in handles and estimated_frfs else None
+    if "indicator_frf" not in handles and estimate is None:
+        raise ValueError(
+            "No FRF matrix found. Expected one of the variables: "
+            + ", ".join(VARIABLE_ROLES["indicator_frf"])
+            + ", or an FRF measurement with force and response time histories"
+        )
+
+    measurements = data.get("operational_data", [])
+    cross_spectra = data.get("cross_spectra", [])
+    indicator_names = list(parameters.get("indicators") or [])
+    target_names = list(parameters.get("targets") or [])
+
+    if estimate is not None:
+        frequencies = estimate.frequencies
+    elif "frequency" in handles:
+        frequencies = np.real(handles["frequency"].read()).ravel().astype(np.float64)
+    elif measurements and measurements[0].axis_name == "frequency":
+        frequencies = measurements[0].axis
+    elif cross_spectra:
+        frequencies = cross_spectra[0].frequencies
+    else:
+        raise ValueError("No frequency vector found in the FRF or operational data")
+    n_freq = len(frequencies)
+
+    if estimate is not None:
+        indicator_frf, target_frf, indicator_names, target_names = _estimated_frf_views(
+            estimate, indicator_names, target_names, parameters.get("frf_estimator", "H1")
+        )
+    else:
+        indicator_frf = datasets.frequency_view(handles["indicator_frf"], n_freq, "indicator FRF")
+        target_frf = datasets.frequency_view(handles["target_frf"], n_freq, "target FRF") if "target_frf" in handles else None
+    n_indicators, n_paths = _frf_dimensions(indicator_frf.shape)
+
+    if target_frf is not None:
+        n_targets, target_paths = _frf_dimensions(target_frf.shape)
+        if target_paths != n_paths:
+            raise ValueError(f"Target FRF has {target_paths} paths, indicator FRF has {n_paths}")
+
+    channels, coherences = {}, {}
+    for measurement in measurements:
+        channels.update(_operational_channels(measurement, frequencies))
+    reference = parameters.get("reference_channel") or (target_names[0] if target_names else None)
+    for spectrum in cross_spectra:
+        spectrum_channels, spectrum_coherences = _spectral_channels(spectrum, frequencies, reference)
+        channels.update(spectrum_channels)
+        coherences.update(spectrum_coherences)
+
+    if "indicator_response" in handles:
+        indicator_response = datasets.frequency_view(handles["indicator_response"], n_freq, "indicator response")
+    elif channels:
+        if not indicator_names:
+            indicator_names = [name for name in channels if name not in target_names]
+        indicator_response = datasets.FrequencyAxisView(
+            datasets.ArrayDataset("indicator response", _select_channels(channels, indicator_names, "indicator")), 0
+        )
+    else:
+        raise ValueError("No operational indicator responses found")
+
+    n_responses = _channel_count(indicator_response.shape)
+    if n_responses != n_indicators:
+        raise ValueError(
+            f"{n_responses} indicator responses given for an FRF matrix with {n_indicators} indicators"
+        )
+    if len(indicator_names) != n_indicators:
+        indicator_names = [f"Indicator {i + 1}" for i in range(n_indicators)]
+
+    if target_frf is None:
+        target_names = indicator_names
+        target_response = indicator_response
+    else:
+        if "target_response" in handles:
+            target_response = datasets.frequency_view(handles["target_response"], n_freq, "target response")
+            if _channel_count(target_response.shape) != n_targets:
+                raise ValueError(f"Target responses do not match the {n_targets} targets of the target FRF")
+        elif target_names and all(name in channels for name in target_names[:n_targets]):
+            target_response = datasets.FrequencyAxisView(
+                datasets.ArrayDataset("target response", _select_channels(channels, target_names[:n_targets], "target")), 0
+            )
+        else:
+            target_response = None
+        if len(target_names) < n_targets:
+            target_names = target_names + [f"Target {i + 1}" for i in range(len(target_names), n_targets)]
+        target_names = target_names[:n_targets]
+
+    path_names = list(parameters.get("paths") or [])
+    if len(path_names) != n_paths:
+        if estimate is not None:
+            path_names = list(estimate.excitation_names)
+        else:
+            path_names = [f"Path {i + 1}" for i in range(n_paths)]
+
+    # Coherence of the measured responses with the phase reference, (n_freq, n_channels)
+    coherence_names = [name for name in dict.fromkeys(indicator_names + target_names) if name in coherences]
+    coherence = np.stack([coherences[name] for name in coherence_names], axis=1) if coherence_names else None
+
+    # File content and variable of the indicator FRF, which identify its decompositions
+    indicator_source = sources.get("indicator_frf") if estimate is None else None
+    if indicator_source is not None and indicator_source.get("content_hash"):
+        indicator_frf_source = (indicator_source["content_hash"], indicator_source["name"])
+    else:
+        indicator_frf_source = None
+
+    return {
+        "frequencies": frequencies,
+        "indicator_frf": indicator_frf,
+        "indicator_response": indicator_response,
+        "target_frf": target_frf,  # None: the indicators are the targets
+        "target_response": target_response,
+        "n_indicators": n_indicators,
+        "n_paths": n_paths,
+        "path_names": path_names,
+        "target_names": target_names,
+        "coherence": coherence,  # None: no time-domain data
+        "indicator_frf_source": indicator_frf_source,  # None: not a stored file variable, not cacheable
+    }
+
+def _decomposition_cache_key(problem: Dict[str, Any], rows: np.ndarray, frequencies: np.ndarray) -> Optional[str]:
+    """FRF cache key of the indicator FRF and responses at ``rows``, or None if it cannot be cached."""
+    if not frf_cache.enabled() or problem["indicator_frf_source"] is None:
+        return None
+    # The responses are read chunk by chunk, like in the solve, to hash them
+    responses = hashlib.sha256()
+    chunk_lines = max(1, settings.TPA_CHUNK_LINES)
+    for start in range(0, len(rows), chunk_lines):
+        chunk = tpa_solver.as_response_matrix(problem["indicator_response"].read_rows(rows[start:start + chunk_lines]))
+        responses.update(chunk.tobytes())
+    content_hash, variable = problem["indicator_frf_source"]
+    return frf_cache.cache_key(content_hash, variable, problem["indicator_frf"].shape, frequencies, responses.hexdigest())
+
+def perform_tpa_analysis(
+    data: Dict[str, Any],
+    parameters: Dict[str, Any],
+    progress: Optional[ProgressReporter] = None
+) -> Dict[str, Any]:
+    """
+    Perform a classical / in-situ matrix-inversion Transfer Path Analysis.
+
+    Frequency lines are processed in chunks of ``TPA_CHUNK_LINES``: each chunk's
+    FRF slab is read from its dataset, path forces are identified for all its
+    lines in one batched solve and multiplied with the target FRFs to obtain
+    per-path contributions, so memory is bounded by the chunk size rather than
+    the size of the FRF files. Per-frequency series are returned as NumPy arrays
+    under ``"arrays"`` for the result store. Progress is reported before each
+    chunk, where a cancelled analysis stops. The SVD of an indicator FRF read
+    from an uploaded file, with the indicator responses projected on it, is kept
+    in the FRF cache and reused by later analyses of the same file, responses
+    and frequency lines.
+
+    With ``method="otpa"`` the analysis is delegated to ``perform_otpa_analysis``.
     """
-    # Extract parameters
+    method = parameters.get("method", "classical")
+    if method not in TPA_METHODS:
+        raise ValueError(f"Unknown TPA method '{method}', expected one of: {', '.join(TPA_METHODS)}")
+    if method == "otpa":
+        return perform_otpa_analysis(data, parameters, progress)
+
     frequency_range = parameters.get("frequency_range", settings.DEFAULT_FREQUENCY_RANGE)
     selected_paths = parameters.get("selected_paths", [])
-    targets = parameters.get("targets", [])
-    paths = parameters.get("paths", [])
-    indicators = parameters.get("indicators", [])
-    
-    # Generate frequency array
-    frequencies = np.logspace(
-        np.log10(frequency_range["min"]), 
-        np.log10(frequency_range["max"]), 
-        settings.DEFAULT_FREQUENCY_RESOLUTION
+    solver = parameters.get("solver", "lstsq")
+    regularization = float(parameters.get("regularization", 0.0))
+    regularization_levels = [float(level) for level in parameters.get("regularization_levels", [])]
+    sweep_method = solver if solver in ("tikhonov", "tsvd") else "tikhonov"
+
+    problem = assemble_tpa_problem(data, parameters)
+    path_names = problem["path_names"]
+    target_names = problem["target_names"]
+    n_paths = problem["n_paths"]
+    n_targets = len(target_names)
+
+    path_index = [i for i, name in enumerate(path_names) if not selected_paths or name in selected_paths]
+    if not path_index:
+        raise ValueError("None of the selected paths exist in the FRF data")
+
+    # Lines in the requested band, in ascending frequency order
+    frequencies = problem["frequencies"]
+    order = np.argsort(frequencies, kind="stable")
+    rows = order[(frequencies[order] >= frequency_range["min"]) & (frequencies[order] <= frequency_range["max"])]
+    if len(rows) == 0:
+        raise ValueError(
+            f"No frequency lines between {frequency_range['min']} and {frequency_range['max']} Hz"
+        )
+    frequencies = frequencies[rows]
+    n_lines = len(rows)
+    rank = min(problem["n_indicators"], n_paths)
+
+    # Per-line outputs and running sums over lines
+    predicted = np.empty((n_lines, n_targets), dtype=np.complex128)
+    primary_tf = np.empty((n_lines, len(path_index)), dtype=np.complex128)
+    primary_magnitudes = np.empty((n_lines, len(path_index)))
+    condition_numbers = np.empty(n_lines)
+    singular_values = np.empty((n_lines, rank))
+    indicator_power = np.zeros(problem["n_indicators"])
+    target_power = np.zeros(n_targets) if problem["target_response"] is not None else None
+    residual_power = 0.0
+    sweep_residual_power = np.zeros(len(regularization_levels))
+    sweep_solution_power = np.zeros(len(regularization_levels))
+
+    # The decomposition of these FRF lines may be cached by an earlier analysis of the same file and responses
+    needs_decomposition = solver in tpa_solver.SVD_SOLVERS or bool(regularization_levels)
+    cache_key = _decomposition_cache_key(problem, rows, frequencies)
+    cached = frf_cache.open_decomposition(cache_key, n_lines) if cache_key else None
+    if cache_key and progress is not None:
+        progress.count_cache("frf_decomposition", cached is not None)
+    cache_writer = None
+    if cache_key and cached is None and needs_decomposition:
+        cache_writer = frf_cache.writer(cache_key, n_lines, problem["n_indicators"], n_paths)
+    # Without a decomposition, conditioning is estimated on evenly spaced lines only
+    conditioning_stride = max(1, -(-n_lines // max(1, settings.CONDITIONING_SAMPLE_LINES)))
+
+    chunk_lines = max(1, settings.TPA_CHUNK_LINES)
+    for start in range(0, n_lines, chunk_lines):
+        chunk_rows = rows[start:start + chunk_lines]
+        lines = slice(start, start + len(chunk_rows))
+        _checkpoint(progress, "inversion", start / n_lines)
+
+        indicator_frf = tpa_solver.as_frf_tensor(problem["indicator_frf"].read_rows(chunk_rows))
+        indicator_response = tpa_solver.as_response_matrix(problem["indicator_response"].read_rows(chunk_rows))
+        if problem["target_frf"] is None:
+            target_frf = indicator_frf
+        else:
+            target_frf = tpa_solver.as_frf_tensor(problem["target_frf"].read_rows(chunk_rows))
+
+        # One batched SVD serves the condition numbers, the regularized inversion and
+        # the regularization sweep. The lstsq and normal solvers need no SVD, so their
+        # conditioning is estimated on sampled lines (NaN elsewhere) to keep it cheap.
+        if cached is not None:
+            projected = frf_cache.read_lines(cached, lines) if needs_decomposition else None
+            chunk_singular_values = np.array(cached.s[lines])
+        elif needs_decomposition:
+            projected = tpa_solver.project_responses(tpa_solver.decompose_frf(indicator_frf), indicator_response)
+            chunk_singular_values = projected.s
+            if cache_writer is not None:
+                cache_writer.write(lines, projected)
+        else:
+            projected = None
+            chunk_singular_values = np.full((len(chunk_rows), rank), np.nan)
+            sampled = np.flatnonzero(np.arange(lines.start, lines.stop) % conditioning_stride == 0)
+            if len(sampled):
+                chunk_singular_values[sampled] = tpa_solver.singular_values(indicator_frf[sampled])
+        singular_values[lines] = chunk_singular_values
+        condition_numbers[lines] = tpa_solver.condition_numbers(chunk_singular_values)
+
+        # Forces are always identified with all paths so cross-coupling is accounted for;
+        # the path selection only restricts what is reported.
+        forces = tpa_solver.solve_forces(
+            indicator_frf,
+            indicator_response,
+            solver=solver,
+            regularization=regularization,
+            projected=projected
+        )
+        contributions = tpa_solver.path_contributions(target_frf, forces)
+        predicted[lines] = contributions.sum(axis=2)
+        primary_tf[lines] = target_frf[:, 0, path_index]
+        primary_magnitudes[lines] = np.abs(contributions[:, 0, path_index])
+
+        # Synthesis check: how well the identified forces reproduce the indicators
+        reconstructed = np.einsum("kip,kp->ki", indicator_frf, forces)
+        residual_power += float(np.sum(np.abs(reconstructed - indicator_response) ** 2))
+        indicator_power += np.sum(np.abs(indicator_response) ** 2, axis=0)
+
+        if target_power is not None:
+            if problem["target_frf"] is None:
+                target_response = indicator_response
+            else:
+                target_response = tpa_solver.as_response_matrix(problem["target_response"].read_rows(chunk_rows))
+            target_power += np.sum(np.abs(target_response) ** 2, axis=0)
+
+        # L-curve over the requested regularization levels, from the same decomposition
+        if regularization_levels:
+            residual_norms, solution_norms = tpa_solver.regularization_sweep(
+                projected, sweep_method, regularization_levels
+            )
+            sweep_residual_power += np.sum(residual_norms ** 2, axis=1)
+            sweep_solution_power += np.sum(solution_norms ** 2, axis=1)
+
+    if cache_writer is not None:
+        cache_writer.commit()
+
+    _checkpoint(progress, "contributions")
+    response_norm = max(np.sqrt(indicator_power.sum()), 1e-300)
+    residual = np.sqrt(residual_power) / response_norm
+
+    results = _tpa_results(
+        frequencies=frequencies,
+        frequency_range=frequency_range,
+        predicted=predicted,
+        primary_tf=primary_tf,
+        primary_magnitudes=primary_magnitudes,
+        reference_power=indicator_power,
+        target_power=target_power,
+        residual=residual,
+        condition_numbers=condition_numbers,
+        singular_values=singular_values,
+        coherence=problem["coherence"][rows] if problem["coherence"] is not None else None,
+        path_names=[path_names[i] for i in path_index],
+        path_index=path_index,
+        target_names=target_names
     )
-    
-    # Simulate computation time for a realistic experience
-    time.sleep(2)
-    
-    # Initialize results structure
+
+    if regularization_levels:
+        results["regularization_sweep"] = [
+            {
+                "method": sweep_method,
+                "level": level,
+                "relative_residual": float(np.sqrt(sweep_residual_power[i]) / response_norm),
+                "solution_norm": float(np.sqrt(sweep_solution_power[i]))
+            }
+            for i, level in enumerate(regularization_levels)
+        ]
+
+    return results
+
+def perform_otpa_analysis(
+    data: Dict[str, Any],
+    parameters: Dict[str, Any],
+    progress: Optional[ProgressReporter] = None
+) -> Dict[str, Any]:
+    """
+    Perform an operational Transfer Path Analysis (OTPA).
+
+    Transmissibilities from the ``references`` (path indicators) to the
+    ``targets`` are identified from operational recordings alone. Every Welch
+    segment of every recording (runs, RPM steps, ...) is one block of the
+    reference/target spectra matrices; their block-averaged cross spectra are
+    solved for all lines in one batched decomposition, keeping the principal
+    components above ``pca_threshold`` to cancel cross-talk between references.
+    Path contributions are the phase-referenced reference spectra times the
+    transmissibilities.
+    """
+    frequency_range = parameters.get("frequency_range", settings.DEFAULT_FREQUENCY_RANGE)
+    selected_paths = parameters.get("selected_paths", [])
+    threshold = float(parameters.get("pca_threshold", settings.OTPA_PCA_THRESHOLD))
+
+    cross_spectra = data.get("cross_spectra", [])
+    if not cross_spectra:
+        raise ValueError("Operational TPA needs time-domain operational recordings")
+    spectrum = spectral.combine_cross_spectra(cross_spectra)
+    channel_names = spectrum.channel_names
+
+    target_names = list(parameters.get("targets") or [])
+    if not target_names:
+        raise ValueError("Operational TPA needs at least one target channel")
+    reference_names = list(parameters.get("references") or parameters.get("indicators") or [])
+    if not reference_names:
+        reference_names = [name for name in channel_names if name not in target_names]
+    missing = [name for name in reference_names + target_names if name not in channel_names]
+    if missing:
+        raise ValueError(f"Operational data is missing channels: {', '.join(missing)}")
+    if not reference_names:
+        raise ValueError("Operational TPA needs at least one reference channel")
+
+    path_names = list(parameters.get("paths") or [])
+    if len(path_names) != len(reference_names):
+        path_names = reference_names
+    path_index = [i for i, name in enumerate(path_names) if not selected_paths or name in selected_paths]
+    if not path_index:
+        raise ValueError("None of the selected paths exist in the operational data")
+
+    frequencies = spectrum.frequencies
+    rows = np.flatnonzero((frequencies >= frequency_range["min"]) & (frequencies <= frequency_range["max"]))
+    if len(rows) == 0:
+        raise ValueError(
+            f"No frequency lines between {frequency_range['min']} and {frequency_range['max']} Hz"
+        )
+    frequencies = frequencies[rows]
+
+    references = [channel_names.index(name) for name in reference_names]
+    targets = [channel_names.index(name) for name in target_names]
+    csd = spectrum.csd[rows]
+    gxx = csd[:, references][:, :, references]
+    gxy = csd[:, references][:, :, targets]
+    gyy = np.real(csd[:, targets, targets])
+
+    # All lines are solved in one batched decomposition
+    _checkpoint(progress, "inversion", 0.0)
+    solution = tpa_solver.otpa_transmissibility(gxx, gxy, threshold)
+    coherence = tpa_solver.multiple_coherence(gxy, gyy, solution.transmissibility)
+
+    # Phase-referenced operational spectra of references and targets
+    phase_reference = parameters.get("reference_channel") or reference_names[0]
+    if phase_reference not in channel_names:
+        raise ValueError(f"Operational data is missing the phase reference channel '{phase_reference}'")
+    spectra = spectrum.referenced_spectra(phase_reference)[rows]
+    reference_spectra = spectra[:, references]
+    target_spectra = spectra[:, targets]
+
+    _checkpoint(progress, "contributions")
+    transmissibility = solution.transmissibility.transpose(0, 2, 1)  # (n_freq, n_targets, n_references)
+    contributions = tpa_solver.path_contributions(transmissibility, reference_spectra)
+    predicted = contributions.sum(axis=2)
+
+    residual = (
+        np.sqrt(np.sum(np.abs(predicted - target_spectra) ** 2)) /
+        max(np.sqrt(np.sum(np.abs(target_spectra) ** 2)), 1e-300)
+    )
+
+    results = _tpa_results(
+        frequencies=frequencies,
+        frequency_range=frequency_range,
+        predicted=predicted,
+        primary_tf=transmissibility[:, 0, path_index],
+        primary_magnitudes=np.abs(contributions[:, 0, path_index]),
+        reference_power=np.sum(np.abs(reference_spectra) ** 2, axis=0),
+        target_power=np.sum(np.abs(target_spectra) ** 2, axis=0),
+        residual=residual,
+        condition_numbers=tpa_solver.condition_numbers(solution.singular_values, solution.n_components),
+        singular_values=solution.singular_values,
+        coherence=coherence,
+        path_names=[path_names[i] for i in path_index],
+        path_index=path_index,
+        target_names=target_names
+    )
+    results["metrics"]["principal_components"] = float(np.mean(solution.n_components))
+    return results
+
+def _tpa_results(
+    frequencies: np.ndarray,
+    frequency_range: Dict[str, float],
+    predicted: np.ndarray,
+    primary_tf: np.ndarray,
+    primary_magnitudes: np.ndarray,
+    reference_power: np.ndarray,
+    target_power: Optional[np.ndarray],
+    residual: float,
+    condition_numbers: np.ndarray,
+    singular_values: np.ndarray,
+    coherence: Optional[np.ndarray],
+    path_names: List[str],
+    path_index: List[int],
+    target_names: List[str]
+) -> Dict[str, Any]:
+    """Summary metrics and per-frequency series shared by the TPA methods."""
+    predicted_rms = tpa_solver.spectrum_rms(predicted)
+    predicted_rms_db = tpa_solver.to_db(predicted_rms, REFERENCE_PRESSURE)
+    # Power of the selected paths at the primary target, relative to the measured
+    # target power (the predicted one when the target was not measured)
+    primary_power = target_power[0] if target_power is not None else predicted_rms[0] ** 2
+    selected_path_power = float(np.sum(primary_magnitudes ** 2))
+
     results = {
         "metrics": {
-            "sound_pressure_level": 78.5,
-            "vibration_amplitude": 0.42,
-            "energy_contribution": 1.24
+            "sound_pressure_level": float(predicted_rms_db[0]),
+            "vibration_amplitude": float(np.mean(np.sqrt(reference_power))),
+            "energy_contribution": float(selected_path_power / max(primary_power, 1e-300))
         },
-        "system_response": [],
-        "transfer_functions": [],
-        "contributions": [],
         "rms_comparison": [],
+        "regularization_sweep": [],
         "performance_indicators": {
-            "overall_accuracy": 92.7,
-            "frequency_range_coverage": 98.5,
-            "path_contribution_confidence": 87.3,
-            "matrix_condition_number": 12.4,
-            "coherence_average": 0.89
+            "overall_accuracy": None,
+            "frequency_range_coverage": float(
+                100 * min(1.0, (frequencies[-1] - frequencies[0]) /
+                          max(frequency_range["max"] - frequency_range["min"], 1e-300))
+            ),
+            "path_contribution_confidence": float(100 * max(0.0, 1 - residual)),
+            "matrix_condition_number": float(np.nanmedian(condition_numbers)),
+            "coherence_average": float(np.mean(coherence)) if coherence is not None else None
         }
     }
-    
-    # Generate system response data
-    for freq in frequencies:
-        # Create a realistic-looking frequency response with resonances and anti-resonances
-        response = (
-            60 +
-            10 * np.sin(freq / 50) -
-            20 * np.exp(-np.power((freq - 500) / 100, 2)) +  # Dip at 500Hz
-            15 * np.exp(-np.power((freq - 1200) / 150, 2)) -  # Peak at 1200Hz
-            0.01 * freq  # General roll-off at higher frequencies
-        )
-        
-        phase = (
-            (-np.arctan2((0.1 * freq) / 500, 1 - np.power(freq / 500, 2)) * 180) / np.pi +
-            20 * np.sin(freq / 200)
-        )
-        
-        results["system_response"].append({
-            "frequency": float(freq),
-            "response": float(max(0, min(80, response))),
-            "phase": float(max(-180, min(180, phase)))
-        })
-    
-    # Generate transfer function data for each path
-    path_names = ["Engine", "Exhaust", "Transmission", "Road", "Wind", "Suspension"]
-    if not selected_paths and paths:
-        selected_paths = paths
-    
-    for i, path_name in enumerate(path_names):
-        if selected_paths and path_name not in selected_paths:
-            continue
-            
-        for freq in frequencies:
-            # Create some realistic-looking transfer function data with resonances
-            magnitude = (
-                20 *
-                np.log10(
-                    1 / np.sqrt(np.power(1 - np.power(freq / 500, 2), 2) + np.power((0.1 * freq) / 500, 2))
-                ) +
-                5 * np.sin(freq / 100) +
-                40 - i * 5  # Different level for each path
-            )
 
-            phase = (
-                (-np.arctan2((0.1 * freq) / 500, 1 - np.power(freq / 500, 2)) * 180) / np.pi +
-                20 * np.sin(freq / 200) + i * 30  # Different phase for each path
-            )
-            
-            results["transfer_functions"].append({
-                "path_id": i,
-                "path_name": path_name,
-                "frequency": float(freq),
-                "magnitude": float(max(-60, min(60, magnitude))),
-                "phase": float(max(-180, min(180, phase)))
+    # Per-frequency series are kept as arrays and persisted by the result store
+    totals = primary_magnitudes.sum(axis=1, keepdims=True)
+    results["arrays"] = {
+        "frequency": frequencies,
+        "path_id": np.asarray(path_index),
+        "path_name": np.asarray(path_names),
+        # Predicted response at the primary target
+        "response": tpa_solver.to_db(predicted[:, 0], REFERENCE_PRESSURE),
+        "response_phase": np.degrees(np.angle(predicted[:, 0])),
+        # Path FRFs (or transmissibilities) to the primary target
+        "tf_magnitude": tpa_solver.to_db(primary_tf),
+        "tf_phase": np.degrees(np.angle(primary_tf)),
+        # Relative contribution magnitudes of the selected paths at the primary target
+        "contribution": np.divide(primary_magnitudes, totals, out=np.zeros_like(primary_magnitudes), where=totals > 0),
+        # Condition number and singular value spectrum of the inverted matrix per line
+        "condition_number": condition_numbers,
+        "singular_values": singular_values,
+    }
+
+    # Measured vs predicted overall levels for every target with measured data
+    if target_power is not None:
+        measured_rms_db = tpa_solver.to_db(np.sqrt(target_power), REFERENCE_PRESSURE)
+        for t, target in enumerate(target_names):
+            absolute_error = abs(measured_rms_db[t] - predicted_rms_db[t])
+            results["rms_comparison"].append({
+                "target_name": target,
+                "measured_rms": float(measured_rms_db[t]),
+                "predicted_rms": float(predicted_rms_db[t]),
+                "absolute_error": float(absolute_error),
+                "relative_error": float(100 * absolute_error / max(abs(measured_rms_db[t]), 1e-300))
             })
-    
-    # Generate contribution data
-    for freq in frequencies:
-        contributions = {}
-        total = 0
-        
-        for i, path_name in enumerate(path_names):
-            if selected_paths and path_name not in selected_paths:
-                continue
-                
-            # Create some realistic-looking contribution data
-            contribution = max(0, 
-                30 + 15 * np.sin(freq / 100) - 0.01 * freq - i * 5 +  # Base pattern
-                10 * np.exp(-np.power((freq - (300 + i * 100)) / 100, 2))  # Peak at different frequencies
-            )
-            
-            contributions[path_name] = float(contribution)
-            total += contribution
-        
-        # Normalize contributions to percentages
-        if total > 0:
-            for path_name in contributions:
-                contributions[path_name] = contributions[path_name] / total
-        
-        results["contributions"].append({
-            "frequency": float(freq),
-            "contributions": contributions
-        })
-    
-    # Generate RMS comparison data for measured vs predicted targets
-    target_names = ["Interior Noise", "Driver Ear", "Passenger Ear", "Seat Vibration"]
-    if targets:
-        target_names = targets[:4]  # Use up to 4 provided targets
-    
-    for target in target_names:
-        # Generate realistic RMS values with slight differences between measured and predicted
-        measured_rms = 60 + np.random.normal(0, 5)
-        predicted_rms = measured_rms + np.random.normal(0, 3)  # Slight prediction error
-        
-        # Calculate error metrics
-        absolute_error = abs(measured_rms - predicted_rms)
-        relative_error = (absolute_error / measured_rms) * 100
-        
-        results["rms_comparison"].append({
-            "target_name": target,
-            "measured_rms": float(measured_rms),
-            "predicted_rms": float(predicted_rms),
-            "absolute_error": float(absolute_error),
-            "relative_error": float(relative_error)
-        })
-    
-    return results
+        relative_errors = [item["relative_error"] for item in results["rms_comparison"]]
+        results["performance_indicators"]["overall_accuracy"] = float(max(0.0, 100 - np.mean(relative_errors)))
 
+    return results
@@ -0,0 +1,271 @@
+import numpy as np
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+# Batched linear algebra for matrix-inversion TPA.
+#
+# All arrays are stacked along the frequency axis first:
+#   frf        (n_freq, n_responses, n_paths)  complex FRF tensor
+#   responses  (n_freq, n_responses)           operational responses
+#   forces     (n_freq, n_paths)               identified (blocked) forces
+#   target_frf (n_freq, n_targets, n_paths)    path FRFs to the target points
+
+SOLVERS = ("lstsq", "normal", "pinv", "tikhonov", "tsvd")
+
+# Solvers that work on the singular value decomposition of the FRF tensor
+SVD_SOLVERS = ("pinv", "tikhonov", "tsvd")
+
+class FRFDecomposition(NamedTuple):
+    """Batched thin SVD ``frf[k] = u[k] @ diag(s[k]) @ vh[k]`` of an FRF tensor."""
+    u: np.ndarray   # (n_freq, n_responses, r)
+    s: np.ndarray   # (n_freq, r), descending
+    vh: np.ndarray  # (n_freq, r, n_paths)
+
+def as_frf_tensor(frf: np.ndarray) -> np.ndarray:
+    """Coerce an FRF array to a complex (n_freq, n_responses, n_paths) tensor."""
+    frf = np.asarray(frf)
+    if frf.ndim == 1:
+        frf = frf[:, None, None]
+    elif frf.ndim == 2:
+        frf = frf[:, None, :]
+    elif frf.ndim != 3:
+        raise ValueError(f"FRF tensor must have 1 to 3 dimensions, got shape {frf.shape}")
+    return np.ascontiguousarray(frf, dtype=np.complex128)
+
+def as_response_matrix(responses: np.ndarray) -> np.ndarray:
+    """Coerce responses to a complex (n_freq, n_channels) matrix."""
+    responses = np.asarray(responses)
+    if responses.ndim == 1:
+        responses = responses[:, None]
+    elif responses.ndim != 2:
+        raise ValueError(f"Response matrix must have 1 or 2 dimensions, got shape {responses.shape}")
+    return np.ascontiguousarray(responses, dtype=np.complex128)
+
+def hermitian(a: np.ndarray) -> np.ndarray:
+    """Conjugate transpose of the last two axes of a stacked array."""
+    return np.conj(np.swapaxes(a, -1, -2))
+
+def decompose_frf(frf: np.ndarray) -> FRFDecomposition:
+    """Compute the thin SVD of every frequency line in one batched call."""
+    u, s, vh = np.linalg.svd(as_frf_tensor(frf), full_matrices=False)
+    return FRFDecomposition(u, s, vh)
+
+def singular_values(frf: np.ndarray) -> np.ndarray:
+    """Singular values of every frequency line, without the singular vectors."""
+    return np.linalg.svd(as_frf_tensor(frf), compute_uv=False)
+
+def condition_numbers(s: np.ndarray, n_kept: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Per-frequency 2-norm condition numbers from (n_freq, r) singular values.
+
+    With ``n_kept`` (n_freq,) only the leading singular values retained per line
+    count, i.e. the conditioning of the truncated matrix that was inverted.
+    """
+    if n_kept is None:
+        smallest = s[:, -1]
+    else:
+        last = np.clip(np.asarray(n_kept) - 1, 0, s.shape[1] - 1)
+        smallest = s[np.arange(len(s)), last]
+    return s[:, 0] / np.maximum(smallest, np.finfo(np.float64).tiny)
+
+def filter_factors(s: np.ndarray, method: str, level: float) -> np.ndarray:
+    """
+    Regularized inverse singular values for every line.
+
+    ``level`` is relative to the largest singular value of each line: Tikhonov
+    uses ``lambda = level * s_max`` and returns ``s / (s^2 + lambda^2)``; truncated
+    SVD discards singular values below ``level * s_max``.
+    """
+    tiny = np.finfo(np.float64).tiny
+    threshold = level * s[:, :1]
+    if method == "tikhonov":
+        return s / np.maximum(s ** 2 + threshold ** 2, tiny)
+    if method in ("tsvd", "pinv"):
+        keep = (s > threshold) & (s > tiny)
+        return np.where(keep, 1 / np.where(keep, s, 1), 0)
+    raise ValueError(f"Unknown regularization method '{method}'")
+
+class ProjectedResponses(NamedTuple):
+    """
+    Responses expressed in the basis of an FRF decomposition.
+
+    This is all the SVD solvers and the regularization sweep need: the left
+    singular vectors only enter through ``projection = U^H responses``.
+    """
+    s: np.ndarray           # (n_freq, r), descending
+    vh: np.ndarray          # (n_freq, r, n_paths)
+    projection: np.ndarray  # (n_freq, r)
+    outside: np.ndarray     # (n_freq,) power of the responses outside the range of the FRF matrix
+
+def project_responses(decomposition: FRFDecomposition, responses: np.ndarray) -> ProjectedResponses:
+    """Project the responses onto the left singular vectors of every line."""
+    responses = as_response_matrix(responses)
+    projection = np.einsum("kir,ki->kr", np.conj(decomposition.u), responses)
+    outside = np.maximum(np.sum(np.abs(responses) ** 2, axis=1) - np.sum(np.abs(projection) ** 2, axis=1), 0)
+    return ProjectedResponses(decomposition.s, decomposition.vh, projection, outside)
+
+def select_lines(projected: ProjectedResponses, lines) -> ProjectedResponses:
+    """Projected responses of a subset of the lines."""
+    return ProjectedResponses(*(values[lines] for values in projected))
+
+def regularized_forces(projected: ProjectedResponses, method: str, level: float) -> np.ndarray:
+    """Forces ``V diag(phi) U^H u`` for one regularization level, reusing the projection."""
+    phi = filter_factors(projected.s, method, level)
+    return np.einsum("krp,kr->kp", np.conj(projected.vh), phi * projected.projection)
+
+def regularization_sweep(
+    projected: ProjectedResponses,
+    method: str,
+    levels: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Residual and solution norms (L-curve) for several regularization levels.
+
+    The responses are projected onto the left singular vectors once; each level
+    then only rescales the projection, so a sweep costs a single SVD plus
+    O(n_freq * r) work per level. Returns two arrays of shape (n_levels, n_freq).
+    """
+    projected_power = np.abs(projected.projection) ** 2
+
+    residual_norms = np.empty((len(levels), len(projected.s)))
+    solution_norms = np.empty_like(residual_norms)
+    for i, level in enumerate(levels):
+        phi = filter_factors(projected.s, method, level)
+        residual_norms[i] = np.sqrt(projected.outside + np.sum(np.abs(1 - projected.s * phi) ** 2 * projected_power, axis=1))
+        solution_norms[i] = np.sqrt(np.sum(phi ** 2 * projected_power, axis=1))
+    return residual_norms, solution_norms
+
+def qr_forces(frf: np.ndarray, responses: np.ndarray, rcond: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Least-squares forces from a batched thin QR factorization ``frf[k] = Q R``.
+
+    Solves ``R forces = Q^H responses``, which keeps the condition number of the
+    FRF matrix instead of squaring it like the normal equations. Lines whose R
+    has a diagonal entry below ``rcond`` times its largest are (numerically)
+    rank deficient and are left as NaN; returns the forces and that mask.
+    """
+    q, r = np.linalg.qr(frf)
+    diagonal = np.abs(np.diagonal(r, axis1=-2, axis2=-1))
+    deficient = diagonal.min(axis=1) <= rcond * diagonal.max(axis=1)
+
+    forces = np.full(frf.shape[::2], np.nan, dtype=np.complex128)
+    solvable = ~deficient
+    if solvable.any():
+        rhs = np.einsum("kir,ki->kr", np.conj(q[solvable]), responses[solvable])
+        forces[solvable] = np.linalg.solve(r[solvable], rhs[..., None])[..., 0]
+    return forces, deficient
+
+def solve_forces(
+    frf: np.ndarray,
+    responses: np.ndarray,
+    solver: str = "lstsq",
+    rcond: Optional[float] = None,
+    regularization: float = 0.0,
+    projected: Optional[ProjectedResponses] = None
+) -> np.ndarray:
+    """
+    Identify path forces for every frequency line at once.
+
+    Solves ``frf[k] @ forces[k] = responses[k]`` in the least-squares sense for
+    all k in batched calls. ``lstsq`` uses a QR factorization and falls back to
+    the pseudo-inverse on (numerically) rank-deficient lines; ``normal`` solves
+    the normal equations, which is faster but squares the condition number and
+    is only accurate for well-conditioned FRF matrices; ``pinv`` uses the
+    pseudo-inverse throughout. ``tikhonov`` and ``tsvd`` regularize the
+    inversion with the relative ``regularization`` level. SVD-based solvers
+    reuse ``projected``, the responses projected on the FRF decomposition, when
+    given.
+    """
+    frf = as_frf_tensor(frf)
+    responses = as_response_matrix(responses)
+
+    n_freq, n_responses, n_paths = frf.shape
+    if responses.shape != (n_freq, n_responses):
+        raise ValueError(
+            f"Responses shape {responses.shape} does not match FRF tensor shape {frf.shape}"
+        )
+    if n_responses < n_paths:
+        raise ValueError(
+            f"Under-determined problem: {n_responses} responses for {n_paths} paths. "
+            "At least as many indicator responses as paths are required."
+        )
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}'. Supported solvers: {', '.join(SOLVERS)}")
+    if rcond is None:
+        rcond = max(n_responses, n_paths) * np.finfo(np.float64).eps
+
+    if solver == "lstsq":
+        forces, deficient = qr_forces(frf, responses, rcond)
+        if deficient.any():
+            lines = np.flatnonzero(deficient)
+            if projected is None:
+                fallback = project_responses(decompose_frf(frf[lines]), responses[lines])
+            else:
+                fallback = select_lines(projected, lines)
+            forces[lines] = regularized_forces(fallback, "pinv", rcond)
+        return forces
+
+    if solver == "normal":
+        frf_h = hermitian(frf)
+        try:
+            return np.linalg.solve(frf_h @ frf, frf_h @ responses[..., None])[..., 0]
+        except np.linalg.LinAlgError:
+            # At least one frequency line is singular; fall back to the pseudo-inverse
+            solver = "pinv"
+
+    if projected is None:
+        projected = project_responses(decompose_frf(frf), responses)
+    if solver == "pinv":
+        return regularized_forces(projected, "pinv", rcond)
+    return regularized_forces(projected, solver, regularization)
+
+def path_contributions(target_frf: np.ndarray, forces: np.ndarray) -> np.ndarray:
+    """Per-path contributions ``target_frf[k, t, p] * forces[k, p]`` for every line and target."""
+    target_frf = as_frf_tensor(target_frf)
+    forces = as_response_matrix(forces)
+    if target_frf.shape[0] != forces.shape[0] or target_frf.shape[2] != forces.shape[1]:
+        raise ValueError(
+            f"Target FRF shape {target_frf.shape} does not match forces shape {forces.shape}"
+        )
+    return target_frf * forces[:, None, :]
+
+class OTPASolution(NamedTuple):
+    """Transmissibilities of an operational TPA with principal component truncation."""
+    transmissibility: np.ndarray  # (n_freq, n_references, n_targets)
+    singular_values: np.ndarray   # (n_freq, n_references), descending, of the block reference matrix
+    n_components: np.ndarray      # (n_freq,) principal components kept per line
+
+def otpa_transmissibility(gxx: np.ndarray, gxy: np.ndarray, threshold: float = 0.0) -> OTPASolution:
+    """
+    Solve the OTPA transmissibilities ``X T = Y`` for all lines at once.
+
+    With block spectra stacked as X (n_blocks, n_references) and Y (n_blocks,
+    n_targets), the least-squares solution only depends on the block-averaged
+    cross spectra ``gxx = X^H X`` and ``gxy = X^H Y``. The eigenvectors of
+    ``gxx`` are the principal components of the references (the right singular
+    vectors of X); components whose singular value falls below ``threshold``
+    times the largest one are discarded, which cancels cross-talk and
+    measurement noise between correlated references.
+    """
+    eigenvalues, vectors = np.linalg.eigh(np.asarray(gxx, dtype=np.complex128))
+    eigenvalues, vectors = eigenvalues[:, ::-1], vectors[:, :, ::-1]
+    s = np.sqrt(np.maximum(eigenvalues, 0.0))
+
+    keep = s > max(threshold, np.finfo(np.float64).eps) * s[:, :1]
+    inverse = np.divide(1.0, s ** 2, out=np.zeros_like(s), where=keep)
+    # T = V diag(1/s^2) V^H gxy over the retained components
+    transmissibility = vectors @ (inverse[:, :, None] * (hermitian(vectors) @ gxy))
+    return OTPASolution(transmissibility, s, keep.sum(axis=1))
+
+def multiple_coherence(gxy: np.ndarray, gyy: np.ndarray, transmissibility: np.ndarray) -> np.ndarray:
+    """(n_freq, n_targets) share of each target's auto spectrum explained by the references."""
+    explained = np.real(np.sum(np.conj(gxy) * transmissibility, axis=1))
+    return np.clip(np.divide(explained, gyy, out=np.zeros_like(explained), where=gyy > 0), 0.0, 1.0)
+
+def spectrum_rms(spectrum: np.ndarray, axis: int = 0) -> np.ndarray:
+    """Overall RMS of a (complex) spectrum, summed over the frequency axis."""
+    return np.sqrt(np.sum(np.abs(spectrum) ** 2, axis=axis))
+
+def to_db(values: np.ndarray, reference: float = 1.0) -> np.ndarray:
+    """Convert amplitudes to decibels, guarding against log of zero."""
+    amplitude = np.maximum(np.abs(values), np.finfo(np.float64).tiny)
+    return 20 * np.log10(amplitude / reference)
@@ -8,6 +8,7 @@ class AnalysisStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class AnalysisBase(BaseModel):
     name: str
@@ -18,11 +19,36 @@ class AnalysisBase(BaseModel):
 class AnalysisCreate(AnalysisBase):
     pass
 
+class AnalysisProgress(BaseModel):
+    stage: str
+    percent: float
+    eta_seconds: Optional[float] = None
+
+class AnalysisSummary(BaseModel):
+    """List entry of an analysis, without its parameters and results."""
+    id: int
+    name: str
+    description: Optional[str] = None
+    file_ids: List[int]
+    status: AnalysisStatus
+    error_message: Optional[str] = None
+    progress: Optional[AnalysisProgress] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class AnalysisPage(BaseModel):
+    items: List[AnalysisSummary]
+    next_cursor: Optional[int] = None  # Pass as ``cursor`` to fetch the next page
+
 class AnalysisResponse(AnalysisBase):
     id: int
     status: AnalysisStatus
     results: Optional[Dict[str, Any]] = None
     error_message: Optional[str] = None
+    progress: Optional[AnalysisProgress] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
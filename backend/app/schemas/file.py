@@ -1,6 +1,6 @@
 from typing import Dict, Any, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class FileBase(BaseModel):
     filename: str
@@ -13,10 +13,15 @@ class FileCreate(FileBase):
 class FileResponse(FileBase):
     id: int
     filepath: str
-    metadata: Dict[str, Any]
+    content_hash: Optional[str] = None
+    # Stored as File.file_metadata; "metadata" is reserved on SQLAlchemy models
+    metadata: Optional[Dict[str, Any]] = Field(None, alias="file_metadata")
+    status: Optional[str] = None  # processing, ready or failed
+    error_message: Optional[str] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
+        allow_population_by_field_name = True
 
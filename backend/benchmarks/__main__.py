@@ -0,0 +1,118 @@
+"""
+Benchmark the ingestion and analysis hot paths on synthetic data.
+
+Run from the backend directory:
+
+    python -m benchmarks --scale small
+    python -m benchmarks --scale medium --scenario frf_h5 --repeat 5
+    python -m benchmarks --scale small --save-baseline
+
+Timings are compared with the stored baseline of the scale (baselines.json
+next to this file); the run exits with status 1 when a stage regressed by
+more than ``--tolerance``. Baselines are machine specific: record them on the
+machine that runs the comparison.
+"""
+import os
+import sys
+import json
+import argparse
+import shutil
+import tempfile
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+def _arguments():
+    from .generators import SCALES
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="TPA engine and ingestion benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--scenario", action="append", help="Scenario to run (repeatable); default: all")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scenario")
+    parser.add_argument("--lines", type=int, help="Override the frequency lines of the scale")
+    parser.add_argument("--paths", type=int, help="Override the number of paths of the scale")
+    parser.add_argument("--targets", type=int, help="Override the number of targets of the scale")
+    parser.add_argument("--duration", type=float, help="Override the recording duration (s) of the scale")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline of the scale")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--workdir", help="Directory for generated data (default: a temporary directory)")
+    return parser.parse_args()
+
+def main() -> int:
+    args = _arguments()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="tpa-benchmarks-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        return _benchmark(args, workdir)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def _benchmark(args, workdir: str) -> int:
+    # Settings are read on import: keep results and the database out of the working tree
+    os.environ["RESULTS_FOLDER"] = os.path.join(workdir, "results")
+    os.environ["FRF_CACHE_FOLDER"] = os.path.join(workdir, "frf_cache")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(workdir, 'benchmarks.db')}"
+    from .generators import SCALES
+    from .suite import SCENARIOS, as_baseline, compare, format_table, run_scenario
+
+    overrides = {
+        name: value for name, value in
+        (("lines", args.lines), ("paths", args.paths), ("targets", args.targets), ("duration", args.duration))
+        if value is not None
+    }
+    scale = SCALES[args.scale]._replace(**overrides)
+    names = args.scenario or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})", file=sys.stderr)
+        return 2
+
+    print(f"Scale {args.scale}: {scale}")
+    results = {}
+    for name in names:
+        print(f"Running {name}...", flush=True)
+        results[name] = run_scenario(SCENARIOS[name], scale, workdir, repeat=args.repeat)
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    # Only runs at a stored scale are comparable with its baseline
+    baseline = None if overrides else baselines.get(args.scale)
+
+    print()
+    print(format_table(results, baseline))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"scale": scale._asdict(), "results": as_baseline(results)}, f, indent=2)
+
+    if args.save_baseline:
+        if overrides:
+            print("Not saving a baseline for a modified scale", file=sys.stderr)
+            return 2
+        stored = baselines.get(args.scale, {})
+        stored.update(as_baseline(results))
+        baselines[args.scale] = stored
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline for scale {args.scale} saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("\nNo baseline to compare with")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
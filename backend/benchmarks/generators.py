@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import h5py
+import scipy.io as sio
+from typing import Dict, NamedTuple
+
+# Synthetic data sets for the benchmark suite.
+#
+# FRF sets use the variable names the engine recognises (f, H, frf_target, u,
+# y), frequency-first, with responses synthesised from random path forces so
+# the analyses are well posed. Operational recordings are time histories of
+# reference accelerometers and target microphones driven by a few shared
+# sources, the layout operational TPA expects. Everything is seeded, so a
+# scale always produces the same data.
+
+class Scale(NamedTuple):
+    lines: int  # Frequency lines of the FRF sets
+    paths: int
+    indicators: int
+    targets: int
+    duration: float  # Seconds of operational recording
+    sample_rate: float
+    references: int  # Reference channels of the operational recordings
+
+SCALES: Dict[str, Scale] = {
+    "small": Scale(lines=2048, paths=6, indicators=8, targets=2, duration=10.0, sample_rate=4096.0, references=6),
+    "medium": Scale(lines=16384, paths=16, indicators=24, targets=4, duration=60.0, sample_rate=8192.0, references=12),
+    "large": Scale(lines=32768, paths=32, indicators=48, targets=8, duration=120.0, sample_rate=16384.0, references=24),
+}
+
+def frf_set(scale: Scale, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Indicator/target FRFs and responses of a synthetic structure, frequency first."""
+    rng = np.random.default_rng(seed)
+
+    def complex_normal(*shape):
+        return (rng.standard_normal(shape) + 1j * rng.standard_normal(shape)).astype(np.complex128)
+
+    frf = complex_normal(scale.lines, scale.indicators, scale.paths)
+    frf_target = complex_normal(scale.lines, scale.targets, scale.paths)
+    forces = complex_normal(scale.lines, scale.paths)
+    return {
+        "f": np.linspace(20.0, 2000.0, scale.lines),
+        "H": frf,
+        "frf_target": frf_target,
+        "u": np.einsum("kip,kp->ki", frf, forces),
+        "y": np.einsum("kip,kp->ki", frf_target, forces),
+    }
+
+def write_frf_mat(path: str, scale: Scale, seed: int = 0):
+    sio.savemat(path, frf_set(scale, seed))
+
+def write_frf_h5(path: str, scale: Scale, seed: int = 0):
+    with h5py.File(path, "w") as f:
+        for name, values in frf_set(scale, seed).items():
+            f.create_dataset(name, data=values)
+
+def operational_recording(scale: Scale, seed: int = 0) -> Dict[str, np.ndarray]:
+    """Reference and target channels excited by shared broadband sources."""
+    rng = np.random.default_rng(seed)
+    n_samples = int(scale.duration * scale.sample_rate)
+    n_sources = max(1, scale.references // 2)
+    sources = rng.standard_normal((n_sources, n_samples))
+    mixing = rng.standard_normal((scale.references, n_sources))
+    references = mixing @ sources + 0.05 * rng.standard_normal((scale.references, n_samples))
+    targets = rng.standard_normal((scale.targets, scale.references)) @ references
+
+    channels = {"time": np.arange(n_samples) / scale.sample_rate}
+    channels.update({f"acc{i + 1}": values for i, values in enumerate(references)})
+    channels.update({f"mic{i + 1}": values for i, values in enumerate(targets)})
+    return channels
+
+def write_operational_csv(path: str, scale: Scale, seed: int = 0):
+    pd.DataFrame(operational_recording(scale, seed)).to_csv(path, index=False)
+
+def write_operational_h5(path: str, scale: Scale, seed: int = 0):
+    with h5py.File(path, "w") as f:
+        for name, values in operational_recording(scale, seed).items():
+            f.create_dataset(name, data=values)
@@ -0,0 +1,173 @@
+import os
+import time
+import hashlib
+import statistics
+import tracemalloc
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from app.db.models.file import File as FileModel
+from app.processing import column_cache, datasets, frf_cache, result_store
+from app.processing.file_processor import process_file
+from app.processing.tpa_engine import load_data_from_files, perform_tpa_analysis, _requested_columns
+from . import generators
+from .generators import Scale
+
+# Benchmark scenarios: one synthetic file taken through the stages an upload
+# and an analysis of it go through. Each stage is timed over several runs (the
+# median is reported) and its peak memory is measured in one extra run under
+# tracemalloc, so tracing does not distort the timings.
+#
+# Warm-cache scenarios give the file a content hash, so analyses go through the
+# FRF cache: a first analysis fills it and the timed one reuses the stored
+# decomposition, as a what-if rerun of the same file would.
+
+CLASSICAL_PARAMETERS = {"solver": "tikhonov", "regularization": 1e-3}
+
+class Scenario(NamedTuple):
+    name: str
+    extension: str
+    write: Callable[[str, Scale], None]
+    parameters: Callable[[Scale], Dict[str, Any]]
+    warm_frf_cache: bool = False
+
+def _otpa_parameters(scale: Scale) -> Dict[str, Any]:
+    return {
+        "method": "otpa",
+        "references": [f"acc{i + 1}" for i in range(scale.references)],
+        "targets": [f"mic{i + 1}" for i in range(scale.targets)],
+    }
+
+SCENARIOS: Dict[str, Scenario] = {
+    scenario.name: scenario for scenario in (
+        Scenario("frf_mat", ".mat", generators.write_frf_mat, lambda scale: CLASSICAL_PARAMETERS),
+        Scenario("frf_h5", ".h5", generators.write_frf_h5, lambda scale: CLASSICAL_PARAMETERS),
+        Scenario("frf_h5_warm", ".h5", generators.write_frf_h5, lambda scale: CLASSICAL_PARAMETERS, warm_frf_cache=True),
+        Scenario("operational_csv", ".csv", generators.write_operational_csv, _otpa_parameters),
+        Scenario("operational_h5", ".h5", generators.write_operational_h5, _otpa_parameters),
+    )
+}
+
+class StageResult(NamedTuple):
+    seconds: float  # Median wall time over the runs
+    peak_mb: float  # Peak traced allocation above the stage's starting point
+
+def _stages(scenario: Scenario, scale: Scale, file_path: str) -> List[tuple]:
+    """The stages of one run, as (name, function of the shared run state)."""
+    content_hash = None
+    if scenario.warm_frf_cache:
+        with open(file_path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()
+    db_file = FileModel(id=1, filename=os.path.basename(file_path), filepath=file_path, content_hash=content_hash)
+    parameters = scenario.parameters(scale)
+
+    def build_cache(state):
+        column_cache.delete_cache(file_path)
+        column_cache.build_cache(file_path)
+
+    def load(state):
+        state["data"] = load_data_from_files(
+            [db_file], state["store"], columns=_requested_columns(parameters)
+        )
+
+    def fill_frf_cache(state):
+        frf_cache.evict(0)
+        perform_tpa_analysis(state["data"], parameters)
+
+    def analyse(state):
+        state["results"] = perform_tpa_analysis(state["data"], parameters)
+
+    def persist(state):
+        result_store.save_results(1, state["results"])
+
+    stages = [("process_file", lambda state: process_file(file_path))]
+    if scenario.extension in column_cache.CACHED_EXTENSIONS:
+        stages.append(("column_cache", build_cache))
+    stages.append(("load_data_from_files", load))
+    if scenario.warm_frf_cache:
+        stages.append(("fill_frf_cache", fill_frf_cache))
+    stages += [("perform_tpa_analysis", analyse), ("save_results", persist)]
+    return stages
+
+def _run(stages: List[tuple], trace_memory: bool) -> Dict[str, tuple]:
+    measurements = {}
+    with datasets.DatasetStore() as store:
+        state = {"store": store}
+        for name, stage in stages:
+            if trace_memory:
+                tracemalloc.reset_peak()
+                start_memory = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            stage(state)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - start_memory if trace_memory else 0
+            measurements[name] = (seconds, peak / 2 ** 20)
+    return measurements
+
+def run_scenario(scenario: Scenario, scale: Scale, workdir: str, repeat: int = 3) -> Dict[str, StageResult]:
+    """Generate the scenario's file in ``workdir`` and benchmark its stages."""
+    file_path = os.path.join(workdir, scenario.name + scenario.extension)
+    scenario.write(file_path, scale)
+    stages = _stages(scenario, scale, file_path)
+
+    timings = [_run(stages, trace_memory=False) for _ in range(max(1, repeat))]
+    tracemalloc.start()
+    try:
+        memory = _run(stages, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        name: StageResult(
+            seconds=statistics.median(run[name][0] for run in timings),
+            peak_mb=memory[name][1]
+        )
+        for name, _ in stages
+    }
+
+def compare(
+    results: Dict[str, Dict[str, StageResult]],
+    baseline: Dict[str, Dict[str, Dict[str, float]]],
+    tolerance: float,
+    min_seconds: float = 0.01
+) -> List[str]:
+    """
+    Regressions of ``results`` against a stored baseline.
+
+    A stage regresses when it is more than ``tolerance`` (a fraction) slower
+    or hungrier than its baseline; ``min_seconds`` of slack keeps very short
+    stages from tripping on timer noise.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(scenario, {}).get(stage)
+            if reference is None:
+                continue
+            if result.seconds > reference["seconds"] * (1 + tolerance) + min_seconds:
+                regressions.append(
+                    f"{scenario}/{stage}: {result.seconds:.3f} s vs baseline {reference['seconds']:.3f} s"
+                )
+            if result.peak_mb > reference["peak_mb"] * (1 + tolerance) + 1.0:
+                regressions.append(
+                    f"{scenario}/{stage}: {result.peak_mb:.1f} MB vs baseline {reference['peak_mb']:.1f} MB"
+                )
+    return regressions
+
+def as_baseline(results: Dict[str, Dict[str, StageResult]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    return {
+        scenario: {
+            stage: {"seconds": round(result.seconds, 4), "peak_mb": round(result.peak_mb, 2)}
+            for stage, result in stages.items()
+        }
+        for scenario, stages in results.items()
+    }
+
+def format_table(results: Dict[str, Dict[str, StageResult]], baseline: Optional[Dict] = None) -> str:
+    lines = [f"{'scenario':<18}{'stage':<24}{'seconds':>10}{'peak MB':>10}{'baseline s':>12}"]
+    for scenario, stages in results.items():
+        for stage, result in stages.items():
+            reference = (baseline or {}).get(scenario, {}).get(stage)
+            lines.append(
+                f"{scenario:<18}{stage:<24}{result.seconds:>10.3f}{result.peak_mb:>10.1f}"
+                + (f"{reference['seconds']:>12.3f}" if reference else f"{'-':>12}")
+            )
+    return "\n".join(lines)
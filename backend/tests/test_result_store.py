@@ -0,0 +1,35 @@
+import numpy as np
+from app.processing.result_store import decimate_rows
+
+def test_decimate_rows_caps_points_with_more_columns_than_max_points():
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal((10000, 64))
+    values[1234, 50] = 100.0  # Peak of one column
+    values[8765, 3] = -100.0  # Notch of another
+
+    rows = decimate_rows(values, slice(None), 20)
+
+    assert len(rows) <= 20
+    assert np.all(np.diff(rows) > 0)
+    assert rows[0] == 0 and rows[-1] == len(values) - 1
+    assert 1234 in rows and 8765 in rows
+
+def test_decimate_rows_respects_columns_and_row_range():
+    values = np.zeros((1000, 3))
+    values[550, 0] = 5.0
+    values[600, 2] = 7.0
+
+    rows = decimate_rows(values, slice(100, 900), 10, columns=[2])
+
+    assert len(rows) <= 10
+    assert rows.min() >= 100 and rows.max() < 900
+    assert 600 in rows and 550 not in rows
+
+def test_decimate_rows_skips_missing_values():
+    values = np.full(1000, np.nan)
+    values[::50] = np.arange(20.0)
+
+    rows = decimate_rows(values, slice(None), 8)
+
+    assert len(rows) <= 8
+    assert 950 in rows
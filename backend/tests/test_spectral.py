@@ -0,0 +1,69 @@
+import numpy as np
+import scipy.signal
+from app.processing import spectral
+
+SAMPLE_RATE = 1000.0
+
+def _stream(estimator, values, block_size=3001):
+    # Blocks that do not line up with the segments exercise the carried-over samples
+    for start in range(0, values.shape[1], block_size):
+        estimator.update(values[:, start:start + block_size])
+    estimator.close()
+    return estimator.result()
+
+def test_welch_cross_spectra_match_scipy():
+    rng = np.random.default_rng(0)
+    source = rng.standard_normal(20000)
+    values = np.stack([
+        source,
+        scipy.signal.lfilter([0.5, 0.3], [1.0, -0.4], source) + 0.2 * rng.standard_normal(20000),
+        rng.standard_normal(20000) + 3.0,  # Offset removed per segment, like detrend="constant"
+    ])
+    estimator = spectral.WelchEstimator(["a", "b", "c"], SAMPLE_RATE, segment_length=256, overlap=0.5, workers=1)
+
+    spectrum = _stream(estimator, values)
+
+    options = dict(fs=SAMPLE_RATE, window="hann", nperseg=256, noverlap=128, detrend="constant")
+    for i in range(3):
+        for j in range(3):
+            frequencies, expected = scipy.signal.csd(values[i], values[j], scaling="spectrum", **options)
+            np.testing.assert_allclose(spectrum.frequencies, frequencies)
+            np.testing.assert_allclose(spectrum.csd[:, i, j], expected, rtol=1e-9, atol=1e-12)
+    for j in range(3):
+        _, expected = scipy.signal.coherence(values[0], values[j], **options)
+        np.testing.assert_allclose(spectrum.coherence("a")[:, j], expected, rtol=1e-9, atol=1e-12)
+
+def test_frf_estimators_recover_known_frfs():
+    rng = np.random.default_rng(1)
+    force = rng.standard_normal(20000)
+    filters = [[1.0, 0.5, -0.25], [0.3, -0.2]]
+    responses = [scipy.signal.lfilter(b, 1.0, force) for b in filters]
+    # One thread per response group, as for large response sets
+    estimator = spectral.FRFEstimator(
+        ["force_1"], ["acc_1", "acc_2"], SAMPLE_RATE, segment_length=512, overlap=0.5, group_size=1, workers=2
+    )
+
+    estimate = _stream(estimator, np.stack([force] + responses))
+
+    expected = np.stack([
+        scipy.signal.freqz(b, 1.0, worN=estimate.frequencies, fs=SAMPLE_RATE)[1] for b in filters
+    ], axis=1)[:, :, None]
+    for name in spectral.FRF_ESTIMATORS:
+        np.testing.assert_allclose(estimate.frf(name), expected, atol=1e-2)
+    # Noise-free responses are fully coherent, apart from the mean-removed DC line
+    assert estimate.coherence()[1:].min() > 0.95
+
+def test_frf_estimators_separate_uncorrelated_inputs():
+    rng = np.random.default_rng(2)
+    forces = rng.standard_normal((2, 20000))
+    filters = [[1.0, 0.5, -0.25], [0.3, -0.2]]
+    response = sum(scipy.signal.lfilter(b, 1.0, f) for b, f in zip(filters, forces))
+    estimator = spectral.FRFEstimator(["force_1", "force_2"], ["acc_1"], SAMPLE_RATE, segment_length=512, workers=1)
+
+    estimate = _stream(estimator, np.vstack([forces, response]))
+
+    expected = np.stack([
+        scipy.signal.freqz(b, 1.0, worN=estimate.frequencies, fs=SAMPLE_RATE)[1] for b in filters
+    ], axis=1)[:, None, :]
+    for name in ("H1", "Hv"):
+        np.testing.assert_allclose(estimate.frf(name), expected, atol=1e-2)
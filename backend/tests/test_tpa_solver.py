@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from app.processing import tpa_solver
+
+def _random_complex(rng, shape):
+    return rng.standard_normal(shape) + 1j * rng.standard_normal(shape)
+
+def _frf_with_singular_values(rng, s, n_freq=16, n_responses=8):
+    """FRF tensor whose every line has the singular values ``s``."""
+    n_paths = len(s)
+    u, _ = np.linalg.qr(_random_complex(rng, (n_freq, n_responses, n_paths)))
+    v, _ = np.linalg.qr(_random_complex(rng, (n_freq, n_paths, n_paths)))
+    return u @ (np.asarray(s)[:, None] * tpa_solver.hermitian(v))
+
+@pytest.mark.parametrize("solver", tpa_solver.SOLVERS)
+def test_solve_forces_recovers_known_forces(solver):
+    rng = np.random.default_rng(0)
+    frf = _random_complex(rng, (32, 8, 4))
+    forces = _random_complex(rng, (32, 4))
+    responses = np.einsum("kip,kp->ki", frf, forces)
+
+    solved = tpa_solver.solve_forces(frf, responses, solver=solver)
+
+    np.testing.assert_allclose(solved, forces, atol=1e-10)
+
+@pytest.mark.parametrize("solver", ["lstsq", "pinv"])
+def test_solve_forces_ill_conditioned(solver):
+    rng = np.random.default_rng(1)
+    frf = _frf_with_singular_values(rng, [1.0, 1e-2, 1e-4, 1e-7])
+    forces = _random_complex(rng, (16, 4))
+    responses = np.einsum("kip,kp->ki", frf, forces)
+
+    solved = tpa_solver.solve_forces(frf, responses, solver=solver)
+
+    # Condition number 1e7: the error grows with it, not with its square
+    np.testing.assert_allclose(solved, forces, atol=1e-6)
+
+def test_solve_forces_rank_deficient_lines_fall_back_to_pseudo_inverse():
+    rng = np.random.default_rng(2)
+    frf = _random_complex(rng, (8, 6, 3))
+    frf[3, :, 2] = frf[3, :, 1]  # Two identical paths on one line
+    responses = _random_complex(rng, (8, 6))
+
+    solved = tpa_solver.solve_forces(frf, responses)
+
+    expected = np.linalg.pinv(frf) @ responses[..., None]
+    np.testing.assert_allclose(solved, expected[..., 0], atol=1e-10)
+
+def test_solve_forces_rejects_under_determined_problems():
+    with pytest.raises(ValueError, match="Under-determined"):
+        tpa_solver.solve_forces(np.ones((4, 2, 3)), np.ones((4, 2)))
+
+@pytest.mark.parametrize("method", ["tikhonov", "tsvd"])
+def test_regularization_sweep_matches_explicit_solutions(method):
+    rng = np.random.default_rng(3)
+    frf = _frf_with_singular_values(rng, [1.0, 0.1, 1e-3, 1e-5])
+    # Random responses also have a part outside the range of the FRF matrix
+    responses = _random_complex(rng, (16, 8))
+    levels = [0.0, 1e-4, 1e-2, 0.5]
+
+    residual_norms, solution_norms = tpa_solver.regularization_sweep(
+        tpa_solver.project_responses(tpa_solver.decompose_frf(frf), responses), method, levels
+    )
+
+    s_max = np.linalg.norm(frf, ord=2, axis=(1, 2))
+    frf_h = tpa_solver.hermitian(frf)
+    for i, level in enumerate(levels):
+        expected_forces = np.empty((16, 4), dtype=np.complex128)
+        for k in range(16):
+            if method == "tikhonov":
+                regularized = frf_h[k] @ frf[k] + (level * s_max[k]) ** 2 * np.eye(4)
+                expected_forces[k] = np.linalg.solve(regularized, frf_h[k] @ responses[k])
+            else:
+                expected_forces[k] = np.linalg.pinv(frf[k], rcond=max(level, 1e-12)) @ responses[k]
+        residuals = np.einsum("kip,kp->ki", frf, expected_forces) - responses
+
+        np.testing.assert_allclose(residual_norms[i], np.linalg.norm(residuals, axis=1), rtol=1e-6)
+        np.testing.assert_allclose(solution_norms[i], np.linalg.norm(expected_forces, axis=1), rtol=1e-6)
+
+def _block_cross_spectra(references, targets):
+    return tpa_solver.hermitian(references) @ references, tpa_solver.hermitian(references) @ targets
+
+def test_otpa_transmissibility_recovers_known_transmissibility():
+    rng = np.random.default_rng(4)
+    transmissibility = _random_complex(rng, (8, 3, 2))
+    references = _random_complex(rng, (8, 100, 3))  # (n_freq, n_blocks, n_references)
+    gxx, gxy = _block_cross_spectra(references, references @ transmissibility)
+
+    solution = tpa_solver.otpa_transmissibility(gxx, gxy)
+
+    np.testing.assert_allclose(solution.transmissibility, transmissibility, atol=1e-10)
+    np.testing.assert_array_equal(solution.n_components, 3)
+
+def test_otpa_truncation_drops_noise_components():
+    rng = np.random.default_rng(5)
+    # Two references driven by one source, with a little independent noise each
+    source = _random_complex(rng, (8, 200, 1))
+    mixing = _random_complex(rng, (8, 1, 2))
+    paths = _random_complex(rng, (8, 1, 3))
+    references = source @ mixing + 1e-3 * _random_complex(rng, (8, 200, 2))
+    targets = source @ paths + 1e-2 * _random_complex(rng, (8, 200, 3))
+    gxx, gxy = _block_cross_spectra(references, targets)
+    # Minimum-norm transmissibility of the noise-free source component
+    expected = np.linalg.pinv(mixing) @ paths
+
+    full = tpa_solver.otpa_transmissibility(gxx, gxy)
+    truncated = tpa_solver.otpa_transmissibility(gxx, gxy, threshold=0.1)
+
+    np.testing.assert_array_equal(full.n_components, 2)
+    np.testing.assert_array_equal(truncated.n_components, 1)
+    np.testing.assert_allclose(truncated.transmissibility, expected, atol=1e-2 * np.abs(expected).max())
+    assert np.linalg.norm(full.transmissibility - expected) > 100 * np.linalg.norm(truncated.transmissibility - expected)
+    # Conditioning of what was actually inverted
+    np.testing.assert_allclose(tpa_solver.condition_numbers(truncated.singular_values, truncated.n_components), 1.0)
@@ -44,6 +44,8 @@ import {
   getPerformanceIndicators,
   getSystemResponse,
   getPathContributions,
+  watchAnalysis,
+  cancelAnalysis,
   type RmsComparisonItem,
   type PerformanceIndicators,
 } from "@/services/api"
@@ -64,6 +66,9 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
   const [zoomLevel, setZoomLevel] = useState(100)
   const [activeTab, setActiveTab] = useState("overview")
 
+  // Points requested per chart; the server decimates while keeping peaks
+  const CHART_MAX_POINTS = 1000
+
   // Colors for charts
   const colors = [
     "#8884d8",
@@ -104,7 +109,7 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
           setPerformanceIndicators(indicators)
 
           // Fetch system response
-          const responseData = await getSystemResponse(analysisId)
+          const responseData = await getSystemResponse(analysisId, { maxPoints: CHART_MAX_POINTS })
           setSystemResponse(responseData)
 
           // Set default selected frequency to middle of range
@@ -126,6 +131,18 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
     fetchData()
   }, [analysisId])
 
+  // Follow queued and running analyses over the progress stream, then load the results
+  const inProgress = analysis?.status === "pending" || analysis?.status === "running"
+  useEffect(() => {
+    if (!inProgress) return
+
+    return watchAnalysis(
+      analysisId,
+      (event) => setAnalysis((current: any) => ({ ...current, status: event.status, progress: event.progress })),
+      () => handleRefresh(),
+    )
+  }, [analysisId, inProgress])
+
   const handleFrequencyChange = (value: string) => {
     setSelectedFrequency(Number.parseFloat(value))
   }
@@ -150,7 +167,7 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
         setPerformanceIndicators(indicators)
 
         // Fetch system response
-        const responseData = await getSystemResponse(analysisId)
+        const responseData = await getSystemResponse(analysisId, { maxPoints: CHART_MAX_POINTS })
         setSystemResponse(responseData)
 
         // Fetch path contributions
@@ -164,6 +181,14 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
     }
   }
 
+  const handleCancel = async () => {
+    try {
+      setAnalysis(await cancelAnalysis(analysisId))
+    } catch (err) {
+      setError(err instanceof Error ? err.message : "An error occurred while cancelling the analysis")
+    }
+  }
+
   // Find the contribution data for the selected frequency
   const getContributionsAtFrequency = () => {
     if (!pathContributions.length) return null
@@ -202,10 +227,10 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
     if (!performanceIndicators) return []
 
     return [
-      { subject: "Overall Accuracy", A: performanceIndicators.overall_accuracy, fullMark: 100 },
+      { subject: "Overall Accuracy", A: performanceIndicators.overall_accuracy ?? 0, fullMark: 100 },
       { subject: "Frequency Coverage", A: performanceIndicators.frequency_range_coverage, fullMark: 100 },
       { subject: "Path Confidence", A: performanceIndicators.path_contribution_confidence, fullMark: 100 },
-      { subject: "Coherence", A: performanceIndicators.coherence_average * 100, fullMark: 100 },
+      { subject: "Coherence", A: (performanceIndicators.coherence_average ?? 0) * 100, fullMark: 100 },
     ]
   }
 
@@ -271,9 +296,16 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
         {analysis.status === "running" && (
           <div className="space-y-2">
             <div className="flex justify-between text-sm">
-              <span>Analysis in progress...</span>
+              <span>
+                {analysis.progress ? `Analysis in progress: ${analysis.progress.stage.replace("_", " ")}` : "Analysis in progress..."}
+              </span>
+              {analysis.progress?.eta_seconds != null && (
+                <span className="text-muted-foreground">
+                  About {Math.ceil(analysis.progress.eta_seconds)} s remaining
+                </span>
+              )}
             </div>
-            <Progress value={45} className="h-2" />
+            <Progress value={analysis.progress?.percent ?? 0} className="h-2" />
           </div>
         )}
 
@@ -295,10 +327,25 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
           </Alert>
         )}
 
-        <Button onClick={handleRefresh} className="gap-2">
-          <RefreshCw className="h-4 w-4" />
-          Refresh Status
-        </Button>
+        {analysis.status === "cancelled" && (
+          <Alert>
+            <AlertCircle className="h-4 w-4" />
+            <AlertTitle>Analysis Cancelled</AlertTitle>
+            <AlertDescription>The analysis was cancelled before it finished.</AlertDescription>
+          </Alert>
+        )}
+
+        <div className="flex gap-2">
+          <Button onClick={handleRefresh} className="gap-2">
+            <RefreshCw className="h-4 w-4" />
+            Refresh Status
+          </Button>
+          {inProgress && (
+            <Button variant="outline" onClick={handleCancel}>
+              Cancel Analysis
+            </Button>
+          )}
+        </div>
       </div>
     )
   }
@@ -353,8 +400,8 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
                 <BarChart3 className="h-4 w-4 text-muted-foreground" />
               </CardHeader>
               <CardContent>
-                <div className="text-2xl font-bold">{performanceIndicators?.overall_accuracy.toFixed(1)}%</div>
-                <Progress value={performanceIndicators?.overall_accuracy} className="h-2 mt-2" />
+                <div className="text-2xl font-bold">{performanceIndicators?.overall_accuracy != null ? `${performanceIndicators.overall_accuracy.toFixed(1)}%` : "N/A"}</div>
+                <Progress value={performanceIndicators?.overall_accuracy ?? 0} className="h-2 mt-2" />
               </CardContent>
             </Card>
 
@@ -377,8 +424,8 @@ export function ResultsDashboard({ analysisId }: ResultsDashboardProps) {
                 <LineChart className="h-4 w-4 text-muted-foreground" />
               </CardHeader>
               <CardContent>
-                <div className="text-2xl font-bold">{performanceIndicators?.coherence_average.toFixed(2)}</div>
-                <Progress value={performanceIndicators?.coherence_average * 100} className="h-2 mt-2" />
+                <div className="text-2xl font-bold">{performanceIndicators?.coherence_average?.toFixed(2) ?? "N/A"}</div>
+                <Progress value={(performanceIndicators?.coherence_average ?? 0) * 100} className="h-2 mt-2" />
               </CardContent>
             </Card>
           </div>
@@ -10,23 +10,63 @@ export interface FileUploadResponse {
   filetype: string
   filesize: number
   metadata: any
+  status: "processing" | "ready" | "failed" | null
+  error_message: string | null
   created_at: string
   updated_at: string | null
 }
 
+export interface AnalysisProgress {
+  stage: string
+  percent: number
+  eta_seconds: number | null
+}
+
 export interface AnalysisResponse {
   id: number
   name: string
   description: string | null
   parameters: any
   file_ids: number[]
-  status: "pending" | "running" | "completed" | "failed"
+  status: "pending" | "running" | "completed" | "failed" | "cancelled"
   results: any | null
   error_message: string | null
+  progress: AnalysisProgress | null
+  created_at: string
+  updated_at: string | null
+}
+
+export interface AnalysisSummary {
+  id: number
+  name: string
+  description: string | null
+  file_ids: number[]
+  status: AnalysisResponse["status"]
+  error_message: string | null
+  progress: AnalysisProgress | null
   created_at: string
   updated_at: string | null
 }
 
+export interface AnalysisProgressEvent {
+  id: number
+  status: AnalysisResponse["status"] | null
+  progress: AnalysisProgress | null
+  error_message: string | null
+}
+
+export interface AnalysisPage {
+  items: AnalysisSummary[]
+  next_cursor: number | null
+}
+
+export interface AnalysisListOptions {
+  cursor?: number
+  limit?: number
+  status?: AnalysisResponse["status"]
+  name?: string
+}
+
 export interface RmsComparisonItem {
   target_name: string
   measured_rms: number
@@ -36,11 +76,11 @@ export interface RmsComparisonItem {
 }
 
 export interface PerformanceIndicators {
-  overall_accuracy: number
+  overall_accuracy: number | null
   frequency_range_coverage: number
   path_contribution_confidence: number
   matrix_condition_number: number
-  coherence_average: number
+  coherence_average: number | null
 }
 
 // File upload API
@@ -71,6 +111,30 @@ export const getFiles = async (): Promise<FileUploadResponse[]> => {
   return response.json()
 }
 
+export const getFile = async (fileId: number): Promise<FileUploadResponse> => {
+  const response = await fetch(`${API_URL}/api/files/${fileId}`)
+
+  if (!response.ok) {
+    throw new Error("Failed to fetch file")
+  }
+
+  return response.json()
+}
+
+// Uploads return while metadata is still being extracted; poll until it is done
+export const waitForFileReady = async (fileId: number, intervalMs = 1000): Promise<FileUploadResponse> => {
+  for (;;) {
+    const file = await getFile(fileId)
+    if (file.status === "failed") {
+      throw new Error(file.error_message || "Failed to process file")
+    }
+    if (file.status !== "processing") {
+      return file
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
+}
+
 export const deleteFile = async (fileId: number): Promise<void> => {
   const response = await fetch(`${API_URL}/api/files/${fileId}`, {
     method: "DELETE",
@@ -104,8 +168,13 @@ export const createAnalysis = async (analysisData: {
   return response.json()
 }
 
-export const getAnalyses = async (): Promise<AnalysisResponse[]> => {
-  const response = await fetch(`${API_URL}/api/analysis/`)
+export const getAnalyses = async (options: AnalysisListOptions = {}): Promise<AnalysisPage> => {
+  const params = new URLSearchParams()
+  Object.entries(options).forEach(([key, value]) => {
+    if (value !== undefined && value !== "") params.set(key, String(value))
+  })
+  const query = params.toString()
+  const response = await fetch(`${API_URL}/api/analysis/${query ? `?${query}` : ""}`)
 
   if (!response.ok) {
     throw new Error("Failed to fetch analyses")
@@ -114,6 +183,34 @@ export const getAnalyses = async (): Promise<AnalysisResponse[]> => {
   return response.json()
 }
 
+// Streams progress events until the analysis completes or fails; returns a function that stops watching
+export const watchAnalysis = (
+  analysisId: number,
+  onProgress: (event: AnalysisProgressEvent) => void,
+  onDone: (event: AnalysisProgressEvent) => void,
+): (() => void) => {
+  const source = new EventSource(`${API_URL}/api/analysis/${analysisId}/events`)
+  source.addEventListener("progress", (event) => onProgress(JSON.parse((event as MessageEvent).data)))
+  source.addEventListener("done", (event) => {
+    source.close()
+    onDone(JSON.parse((event as MessageEvent).data))
+  })
+  return () => source.close()
+}
+
+export const cancelAnalysis = async (analysisId: number): Promise<AnalysisResponse> => {
+  const response = await fetch(`${API_URL}/api/analysis/${analysisId}/cancel`, {
+    method: "POST",
+  })
+
+  if (!response.ok) {
+    const error = await response.json().catch(() => null)
+    throw new Error(error?.detail || "Failed to cancel analysis")
+  }
+
+  return response.json()
+}
+
 export const getAnalysis = async (analysisId: number): Promise<AnalysisResponse> => {
   const response = await fetch(`${API_URL}/api/analysis/${analysisId}`)
 
@@ -135,11 +232,33 @@ export const getAnalysisSummary = async (analysisId: number): Promise<any> => {
   return response.json()
 }
 
-export const getPathContributions = async (analysisId: number, frequency?: number): Promise<any> => {
-  let url = `${API_URL}/api/results/${analysisId}/contributions`
+export interface ResultRangeOptions {
+  fMin?: number
+  fMax?: number
+  maxPoints?: number
+  pathIds?: number[]
+}
+
+// Build the query string for server-side frequency slicing and decimation
+const resultRangeQuery = (options: ResultRangeOptions = {}, params = new URLSearchParams()): string => {
+  if (options.fMin !== undefined) params.append("f_min", String(options.fMin))
+  if (options.fMax !== undefined) params.append("f_max", String(options.fMax))
+  if (options.maxPoints !== undefined) params.append("max_points", String(options.maxPoints))
+  options.pathIds?.forEach((pathId) => params.append("path_ids", String(pathId)))
+  const query = params.toString()
+  return query ? `?${query}` : ""
+}
+
+export const getPathContributions = async (
+  analysisId: number,
+  frequency?: number,
+  options?: ResultRangeOptions,
+): Promise<any> => {
+  const params = new URLSearchParams()
   if (frequency) {
-    url += `?frequency=${frequency}`
+    params.append("frequency", String(frequency))
   }
+  const url = `${API_URL}/api/results/${analysisId}/contributions${resultRangeQuery(options, params)}`
 
   const response = await fetch(url)
 
@@ -150,11 +269,16 @@ export const getPathContributions = async (analysisId: number, frequency?: numbe
   return response.json()
 }
 
-export const getTransferFunctions = async (analysisId: number, pathId?: number): Promise<any> => {
-  let url = `${API_URL}/api/results/${analysisId}/transfer-functions`
+export const getTransferFunctions = async (
+  analysisId: number,
+  pathId?: number,
+  options?: ResultRangeOptions,
+): Promise<any> => {
+  const params = new URLSearchParams()
   if (pathId !== undefined) {
-    url += `?path_id=${pathId}`
+    params.append("path_id", String(pathId))
   }
+  const url = `${API_URL}/api/results/${analysisId}/transfer-functions${resultRangeQuery(options, params)}`
 
   const response = await fetch(url)
 
@@ -165,8 +289,8 @@ export const getTransferFunctions = async (analysisId: number, pathId?: number):
   return response.json()
 }
 
-export const getSystemResponse = async (analysisId: number): Promise<any> => {
-  const response = await fetch(`${API_URL}/api/results/${analysisId}/system-response`)
+export const getSystemResponse = async (analysisId: number, options?: ResultRangeOptions): Promise<any> => {
+  const response = await fetch(`${API_URL}/api/results/${analysisId}/system-response${resultRangeQuery(options)}`)
 
   if (!response.ok) {
     throw new Error("Failed to fetch system response")